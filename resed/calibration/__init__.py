@@ -5,3 +5,8 @@ Provides tools for mapping raw sensor diagnostics to normalized risk scores.
 """
 
 from .calibrator import RlcsCalibrator
+from .sketch import KllSketch
+from .state import CalibrationState
+from .profile import save_profile, load_profile
+from .registry import ProfileRegistry, ReferenceProfile
+from .bootstrap import bootstrap_cutoffs, bootstrap_interval
@@ -0,0 +1,145 @@
+"""
+Bootstrap Confidence Bands.
+
+Bootstrap distribution of the raw cutoff that a calibrator fitted on a
+reference would assign to a Z threshold (e.g. TAU_D), without refitting a
+calibrator per resample.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from resed.calibration.quantile import quantile_grid, compile_z_table, invert_z_table
+from resed.rlcs.thresholds import TAU_D
+
+_WORKER_SCORES = None
+
+def resample_indices(n: int, seed: int, boot: int) -> np.ndarray:
+    """
+    Index array of one bootstrap resample.
+    
+    Resample `boot` depends only on (seed, boot), so results are identical
+    for any blocking or number of worker processes.
+    
+    Args:
+        n: Reference size.
+        seed: Bootstrap seed.
+        boot: Resample number.
+        
+    Returns:
+        Indices (n,) into the sorted reference scores.
+    """
+    return np.random.default_rng([seed, boot]).integers(0, n, n)
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Linear interpolation with the same rounding as np.quantile."""
+    diff = b - a
+    out = a + diff * t
+    return np.where(t >= 0.5, b - diff * (1 - t), out)
+
+def _resample_cutoffs(sorted_scores: np.ndarray, boots: np.ndarray, seed: int, quantiles: np.ndarray,
+                      z_threshold: float, epsilon: float, resolution: float) -> np.ndarray:
+    """Cutoffs for a block of resamples, vectorized across the block."""
+    n = sorted_scores.shape[0]
+    n_block = boots.shape[0]
+    
+    # Resample multiplicities; a cumulative count over the whole block turns
+    # every order statistic of every resample into one searchsorted query.
+    counts = np.empty(n_block * n, dtype=np.int64)
+    for r, boot in enumerate(boots):
+        counts[r * n:(r + 1) * n] = np.bincount(resample_indices(n, seed, boot), minlength=n)
+    cumulative = np.cumsum(counts)
+    
+    # np.quantile (linear): virtual index h = q (n - 1)
+    h = quantiles * (n - 1)
+    lo = np.floor(h).astype(np.int64)
+    hi = np.minimum(lo + 1, n - 1)
+    row_offset = (np.arange(n_block, dtype=np.int64) * n)[:, None]
+    
+    def order_statistic(rank):
+        position = np.searchsorted(cumulative, row_offset + rank, side='right')
+        return sorted_scores[position - row_offset]
+        
+    values = _lerp(order_statistic(lo), order_statistic(hi), h - lo)
+    raw_knots, z_knots = compile_z_table(quantiles, values, epsilon=epsilon, resolution=resolution)
+    return invert_z_table(raw_knots, z_knots, z_threshold)
+
+def _init_worker(sorted_scores: np.ndarray):
+    global _WORKER_SCORES
+    _WORKER_SCORES = sorted_scores
+
+def _worker_cutoffs(boots: np.ndarray, **kwargs) -> np.ndarray:
+    return _resample_cutoffs(_WORKER_SCORES, boots, **kwargs)
+
+def bootstrap_cutoffs(scores: np.ndarray, z_threshold: float = TAU_D, n_boot: int = 200, seed: int = 0,
+                      num_quantiles: int = 256, grid: str = 'normal', resolution: float = 0.01,
+                      epsilon: float = 1e-6, block_size: int = None, n_jobs: int = 1) -> np.ndarray:
+    """
+    Bootstrap distribution of the calibrated raw cutoff for z_threshold.
+    
+    Resample b equals fitting RlcsCalibrator(resolution) with
+    (num_quantiles, grid) on np.sort(scores)[resample_indices(n, seed, b)]
+    and calling raw_threshold(z_threshold), up to rounding. Resamples are
+    drawn as index arrays and reduced to multiplicities, so no resampled
+    data is materialized and the quantile knots of a whole block of
+    resamples come from one cumulative count and one searchsorted.
+    Blocks can fan out across a process pool; the sorted reference is sent
+    to each worker once.
+    
+    Args:
+        scores: Reference raw scores (n,).
+        z_threshold: Threshold in calibrated units (default TAU_D).
+        n_boot: Number of resamples.
+        seed: Bootstrap seed.
+        num_quantiles: Quantile knots of the calibrator being bootstrapped.
+        grid: Quantile grid of the calibrator being bootstrapped.
+        resolution: Table resolution of the calibrator being bootstrapped.
+        epsilon: Rank clamp of the calibrator being bootstrapped.
+        block_size: Resamples per vectorized block (default: ~2^22 / n, at least 1).
+        n_jobs: Worker processes (1: evaluate in-process).
+        
+    Returns:
+        Cutoffs (n_boot,), in resample order.
+        
+    Raises:
+        ValueError: If scores is empty.
+    """
+    sorted_scores = np.sort(np.asarray(scores, dtype=float).reshape(-1))
+    n = sorted_scores.shape[0]
+    if n == 0:
+        raise ValueError("Cannot bootstrap an empty reference.")
+    if block_size is None:
+        block_size = max(1, (1 << 22) // n)
+        
+    blocks = [np.arange(start, min(start + block_size, n_boot)) for start in range(0, n_boot, block_size)]
+    params = dict(seed=seed, quantiles=quantile_grid(num_quantiles, grid), z_threshold=z_threshold,
+                  epsilon=epsilon, resolution=resolution)
+    
+    if n_jobs == 1 or len(blocks) <= 1:
+        results = [_resample_cutoffs(sorted_scores, boots, **params) for boots in blocks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(sorted_scores,)) as executor:
+            results = list(executor.map(partial(_worker_cutoffs, **params), blocks))
+    return np.concatenate(results) if results else np.zeros(0)
+
+def bootstrap_interval(scores: np.ndarray, z_threshold: float = TAU_D, confidence: float = 0.95,
+                       **kwargs) -> tuple[float, float, np.ndarray]:
+    """
+    Percentile bootstrap confidence interval for the calibrated raw cutoff.
+    
+    Args:
+        scores: Reference raw scores (n,).
+        z_threshold: Threshold in calibrated units (default TAU_D).
+        confidence: Two-sided confidence level.
+        **kwargs: Passed to bootstrap_cutoffs (n_boot, seed, n_jobs, ...).
+        
+    Returns:
+        low: Lower interval bound.
+        high: Upper interval bound.
+        cutoffs: Bootstrap cutoffs (n_boot,).
+    """
+    cutoffs = bootstrap_cutoffs(scores, z_threshold=z_threshold, **kwargs)
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(cutoffs, [alpha, 1.0 - alpha])
+    return float(low), float(high), cutoffs
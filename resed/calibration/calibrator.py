@@ -4,9 +4,19 @@ RLCS Calibrator.
 Manages the calibration of raw sensor diagnostics into normalized risk scores.
 """
 
+from collections import deque
 import numpy as np
-from scipy.special import ndtri
-from resed.calibration.quantile import estimate_quantiles, map_to_quantile
+from resed.calibration.quantile import estimate_quantiles, compile_z_table, invert_z_table, mix_quantiles
+from resed.calibration.state import CalibrationState
+
+def _iter_chunks(source, chunk_size: int):
+    """Yield chunks from an array/memmap (sliced) or from an iterable of chunks."""
+    if hasattr(source, 'shape'):
+        for start in range(0, source.shape[0], chunk_size):
+            yield np.asarray(source[start:start + chunk_size], dtype=float)
+    else:
+        for chunk in source:
+            yield np.asarray(chunk, dtype=float)
 
 class RlcsCalibrator:
     """
@@ -15,34 +25,213 @@ class RlcsCalibrator:
     fixed RLCS thresholds (e.g., TAU=3.0 implies 3-sigma rarity).
     """
     
-    def __init__(self):
+    def __init__(self, resolution: float = 0.01, forgetting: float = None, window: int = None):
+        """
+        Initialize an empty calibrator.
+        
+        Args:
+            resolution: Maximum Z spacing of the compiled raw -> Z tables.
+            forgetting: Exponential forgetting factor in (0, 1] applied to
+                the accumulated weight before each update (None: no forgetting).
+            window: If set, calibrate on the last `window` updates only
+                (the initial fit counts as one update).
+                
+        Raises:
+            ValueError: If both forgetting and window are set, or either is out of range.
+        """
+        if forgetting is not None and window is not None:
+            raise ValueError("Use either forgetting or window, not both.")
+        if forgetting is not None and not 0.0 < forgetting <= 1.0:
+            raise ValueError(f"forgetting must be in (0, 1], got {forgetting}")
+        if window is not None and window < 1:
+            raise ValueError(f"window must be positive, got {window}")
         self.reference_distributions = {}
+        self.tables = {}
+        self.counts = {}
+        self._history = {}
+        self._cutoffs = {}
         self.is_calibrated = False
         self.epsilon = 1e-6 # Bound for numerical stability (approx 4.75 sigma)
+        self.resolution = resolution
+        self.forgetting = forgetting
+        self.window = window
 
-    def fit(self, diagnostics: dict):
+    def fit(self, diagnostics: dict, num_quantiles: int = 256, grid: str = 'normal'):
         """
         Fit calibration curves from reference diagnostics.
         
+        The default grid places knots evenly in Z-space, so the tails where
+        the 3-sigma thresholds act are resolved as finely as the centre
+        (see docs/calibration_layer.md for the accuracy/size trade-off).
+        
         Args:
             diagnostics: Dictionary of {sensor_name: raw_scores_array}.
+            num_quantiles: Number of quantile knots per sensor.
+            grid: Spacing of the quantile levels ('normal' or 'uniform').
         """
         self.reference_distributions = {}
+        self.counts = {}
         for sensor, scores in diagnostics.items():
-            q, vals = estimate_quantiles(scores)
+            q, vals = estimate_quantiles(scores, num_quantiles=num_quantiles, grid=grid)
             self.reference_distributions[sensor] = (q, vals)
+            self.counts[sensor] = float(len(scores))
+        self._start_history()
+        self._compile()
+        self.is_calibrated = True
+
+    def fit_stream(self, sources: dict, chunk_size: int = 1_000_000, num_quantiles: int = 256,
+                   grid: str = 'normal', sketch_k: int = 8192, seed: int = 0):
+        """
+        Fit calibration curves from reference diagnostics streamed in chunks.
+        
+        Each sensor's scores are folded into a KllSketch, so memory stays
+        bounded (O(sketch_k) per sensor) whatever the reference size, and no
+        full sort is needed. Quantile values carry a normalized rank error
+        below ~2 / sketch_k (see KllSketch).
+        
+        Args:
+            sources: Dictionary of {sensor_name: scores}, where scores is an
+                array or np.memmap (read in chunk_size slices) or an
+                iterable of score chunks (e.g. a generator).
+            chunk_size: Slice length for array sources.
+            num_quantiles: Number of quantile knots in the fitted table.
+            grid: Spacing of the quantile levels ('normal' or 'uniform').
+            sketch_k: Sketch accuracy parameter.
+            seed: Seed for sketch compaction.
+        """
+        state = CalibrationState(sketch_k=sketch_k, seed=seed)
+        for sensor, source in sources.items():
+            for chunk in _iter_chunks(source, chunk_size):
+                state.update({sensor: chunk})
+        self.fit_state(state, num_quantiles=num_quantiles, grid=grid)
+
+    def fit_state(self, state: CalibrationState, num_quantiles: int = 256, grid: str = 'normal'):
+        """
+        Fit calibration curves from a (possibly merged) CalibrationState.
+        
+        Args:
+            state: Calibration state, e.g. CalibrationState.merge_all over shards.
+            num_quantiles: Number of quantile knots in the fitted table.
+            grid: Spacing of the quantile levels ('normal' or 'uniform').
+        """
+        self.reference_distributions = state.quantile_tables(num_quantiles, grid)
+        self.counts = {sensor: float(sketch.n) for sensor, sketch in state.sketches.items()}
+        self._start_history()
+        self._compile()
         self.is_calibrated = True
 
-    def _to_z_score(self, quantile: float) -> float:
-        """Convert quantile (0, 1) to Z-score (-inf, inf)."""
-        # Clamp to avoid inf
-        q_clamped = np.clip(quantile, self.epsilon, 1.0 - self.epsilon)
-        return float(ndtri(q_clamped))
+    def update(self, diagnostics: dict, num_quantiles: int = 256, grid: str = 'normal'):
+        """
+        Fold new reference scores into the existing calibration.
+        
+        The chunk's quantile table is mixed with the current one by CDF
+        averaging, weighted by sample count. With `forgetting`, the current
+        weight is first multiplied by the factor (exponential forgetting);
+        with `window`, only the last `window` chunk tables are mixed (sliding
+        window). Each update costs O(chunk) for the chunk quantiles plus
+        O(num_quantiles) (times `window`) for the mix; memory is bounded by
+        the tables alone. Sensors seen for the first time are fitted from
+        the chunk with the given grid; a table without a sample count (e.g.
+        loaded from a profile saved before counts were stored) is weighted
+        like the incoming chunk.
+        
+        Args:
+            diagnostics: Dictionary of {sensor_name: raw_scores_chunk}.
+            num_quantiles: Number of quantile knots for new sensors.
+            grid: Quantile grid for new sensors.
+        """
+        for sensor, scores in diagnostics.items():
+            scores = np.asarray(scores, dtype=float).reshape(-1)
+            if scores.shape[0] == 0:
+                continue
+            if sensor not in self.reference_distributions:
+                q, vals = estimate_quantiles(scores, num_quantiles=num_quantiles, grid=grid)
+                self.reference_distributions[sensor] = (q, vals)
+                self.counts[sensor] = float(scores.shape[0])
+                self._history[sensor] = deque([(q, vals, self.counts[sensor])], maxlen=self.window)
+            else:
+                q = self.reference_distributions[sensor][0]
+                chunk = (q, np.quantile(scores, q), float(scores.shape[0]))
+                if self.window is not None:
+                    history = self._history[sensor]
+                    history.append(chunk)
+                    tables = [(q_i, vals_i) for q_i, vals_i, _ in history]
+                    weights = [chunk[2] if n_i is None else n_i for _, _, n_i in history]
+                else:
+                    decay = 1.0 if self.forgetting is None else self.forgetting
+                    tables = [self.reference_distributions[sensor], chunk[:2]]
+                    weights = [decay * self.counts.get(sensor, chunk[2]), chunk[2]]
+                self.reference_distributions[sensor] = (q, mix_quantiles(q, tables, weights))
+                self.counts[sensor] = float(sum(weights))
+            self._compile_sensor(sensor)
+        self.is_calibrated = bool(self.tables)
 
-    def _to_z_score_batch(self, quantiles: np.ndarray) -> np.ndarray:
-        """Vectorized Z-score conversion."""
-        q_clamped = np.clip(quantiles, self.epsilon, 1.0 - self.epsilon)
-        return ndtri(q_clamped)
+    def _start_history(self):
+        """Seed the sliding window with the fitted tables."""
+        self._history = {
+            sensor: deque([(q, vals, self.counts.get(sensor))], maxlen=self.window)
+            for sensor, (q, vals) in self.reference_distributions.items()
+        }
+
+    def _compile(self):
+        """
+        Compile every quantile table into a raw -> Z lookup table.
+        
+        The quantile-to-Z mapping is fixed once fitted, so the probit is
+        evaluated here once instead of on every calibrated sample.
+        """
+        self.tables = {
+            sensor: compile_z_table(q, vals, epsilon=self.epsilon, resolution=self.resolution)
+            for sensor, (q, vals) in self.reference_distributions.items()
+        }
+        self._cutoffs = {}
+
+    def to_arrays(self) -> dict:
+        """Return the fitted quantile and compiled raw -> Z tables as a dictionary of arrays."""
+        arrays = {'resolution': np.asarray(self.resolution), 'epsilon': np.asarray(self.epsilon)}
+        for sensor, (q, vals) in self.reference_distributions.items():
+            raw_knots, z_knots = self.tables[sensor]
+            arrays[f"{sensor}/quantiles"] = q
+            arrays[f"{sensor}/values"] = vals
+            arrays[f"{sensor}/raw_knots"] = raw_knots
+            arrays[f"{sensor}/z_knots"] = z_knots
+            if sensor in self.counts:
+                arrays[f"{sensor}/count"] = np.asarray(self.counts[sensor])
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "RlcsCalibrator":
+        """
+        Rebuild a calibrator from RlcsCalibrator.to_arrays without recompiling.
+        
+        Per-sensor sample counts are optional; sensors saved without one
+        keep no count (see update).
+        
+        Args:
+            arrays: Dictionary of arrays (may be read-only memory maps).
+            
+        Returns:
+            RlcsCalibrator; calibrated if any sensor table is present.
+        """
+        calibrator = cls(resolution=float(arrays['resolution']))
+        calibrator.epsilon = float(arrays['epsilon'])
+        sensors = {name.split('/')[0] for name in arrays if '/' in name}
+        for sensor in sorted(sensors):
+            calibrator.reference_distributions[sensor] = (
+                arrays[f"{sensor}/quantiles"], arrays[f"{sensor}/values"]
+            )
+            calibrator.tables[sensor] = (arrays[f"{sensor}/raw_knots"], arrays[f"{sensor}/z_knots"])
+            if f"{sensor}/count" in arrays:
+                calibrator.counts[sensor] = float(arrays[f"{sensor}/count"])
+        calibrator._start_history()
+        calibrator.is_calibrated = bool(sensors)
+        return calibrator
+
+    def _compile_sensor(self, sensor: str):
+        """Recompile one sensor's table and drop its cached cutoffs."""
+        q, vals = self.reference_distributions[sensor]
+        self.tables[sensor] = compile_z_table(q, vals, epsilon=self.epsilon, resolution=self.resolution)
+        self._cutoffs = {key: cutoff for key, cutoff in self._cutoffs.items() if key[0] != sensor}
 
     def calibrate(self, sensor_name: str, raw_value: float) -> float:
         """
@@ -55,20 +244,83 @@ class RlcsCalibrator:
         Returns:
             Z-score relative to reference distribution.
         """
-        if not self.is_calibrated or sensor_name not in self.reference_distributions:
+        if not self.is_calibrated or sensor_name not in self.tables:
             return raw_value
             
-        q, vals = self.reference_distributions[sensor_name]
-        rank = map_to_quantile(raw_value, q, vals)
-        return self._to_z_score(rank)
+        raw_knots, z_knots = self.tables[sensor_name]
+        return float(np.interp(raw_value, raw_knots, z_knots))
 
     def calibrate_batch(self, sensor_name: str, raw_values: np.ndarray) -> np.ndarray:
         """
         Vectorized calibration.
+        
+        One binary search plus linear interpolation per sample in the
+        compiled raw -> Z table; matches the exact quantile/probit map to
+        within `resolution`.
         """
-        if not self.is_calibrated or sensor_name not in self.reference_distributions:
+        if not self.is_calibrated or sensor_name not in self.tables:
             return raw_values
             
-        q, vals = self.reference_distributions[sensor_name]
-        ranks = np.interp(raw_values, vals, q, left=0.0, right=1.0)
-        return self._to_z_score_batch(ranks)
+        raw_knots, z_knots = self.tables[sensor_name]
+        return np.interp(raw_values, raw_knots, z_knots)
+
+    def calibrate_stack(self, scores: np.ndarray, sensor_names) -> np.ndarray:
+        """
+        Calibrate a matrix of scores from several sensors in one call.
+        
+        Column j is mapped through the table of sensor_names[j]; columns
+        without a fitted table are passed through unchanged. Each column is
+        one binary-search interpolation over its own table, which measured
+        faster than a single interpolation over the concatenated tables
+        (the interleaved queries then search a table n_sensors times larger).
+        
+        Args:
+            scores: Raw scores (batch_size, n_sensors).
+            sensor_names: Sensor name per column (n_sensors,).
+            
+        Returns:
+            Z-scores (batch_size, n_sensors).
+            
+        Raises:
+            ValueError: If the number of columns does not match sensor_names.
+        """
+        scores = np.asarray(scores, dtype=float)
+        if scores.ndim != 2 or scores.shape[1] != len(sensor_names):
+            raise ValueError(f"Expected scores of shape (batch, {len(sensor_names)}), got {scores.shape}")
+            
+        out = scores.copy()
+        if not self.is_calibrated:
+            return out
+        for j, sensor in enumerate(sensor_names):
+            table = self.tables.get(sensor)
+            if table is not None:
+                out[:, j] = np.interp(scores[:, j], *table)
+        return out
+
+    def raw_threshold(self, sensor_name: str, z_threshold: float) -> float:
+        """
+        Invert a calibrated threshold into a raw-score cutoff.
+        
+        The compiled raw -> Z map is monotone, so
+        calibrate(raw) > z_threshold  <=>  raw > cutoff
+        (up to floating-point rounding at the cutoff itself). Decisions can
+        then compare raw scores directly, with no per-sample calibration.
+        Cutoffs are cached until the calibrator is refitted.
+        
+        Args:
+            sensor_name: Name of the sensor.
+            z_threshold: Threshold in calibrated (Z) units.
+            
+        Returns:
+            Raw cutoff (may be -inf or inf). For sensors without a fitted
+            table the threshold is returned unchanged.
+        """
+        if not self.is_calibrated or sensor_name not in self.tables:
+            return z_threshold
+            
+        key = (sensor_name, float(z_threshold))
+        if key not in self._cutoffs:
+            raw_knots, z_knots = self.tables[sensor_name]
+            self._cutoffs[key] = float(invert_z_table(raw_knots, z_knots, z_threshold))
+            
+        return self._cutoffs[key]
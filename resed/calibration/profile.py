@@ -0,0 +1,71 @@
+"""
+Calibration Profiles.
+
+Persists a fitted RlcsCalibrator together with its reference population as
+one checksummed, memory-mappable artifact (see resed.utils.artifact), so a
+cold process can start serving without refitting.
+"""
+
+from resed.calibration.calibrator import RlcsCalibrator
+from resed.rlcs.reference import WhitenedReference, LowRankReference, MixtureReference
+from resed.utils.artifact import save_artifact, load_artifact
+
+REFERENCE_TYPES = {
+    cls.__name__: cls for cls in (WhitenedReference, LowRankReference, MixtureReference)
+}
+
+def save_profile(path: str, calibrator: RlcsCalibrator = None, reference=None, meta: dict = None):
+    """
+    Save a calibrator and/or reference as a single artifact.
+    
+    Args:
+        path: Output path.
+        calibrator: Fitted RlcsCalibrator.
+        reference: WhitenedReference, LowRankReference or MixtureReference.
+        meta: Additional JSON-serializable metadata (e.g. dataset name).
+        
+    Raises:
+        ValueError: If the reference type is not supported.
+    """
+    arrays = {}
+    header = {'meta': meta or {}, 'reference_type': None, 'has_calibrator': calibrator is not None}
+    if calibrator is not None:
+        arrays.update({f"calibrator/{k}": v for k, v in calibrator.to_arrays().items()})
+    if reference is not None:
+        name = type(reference).__name__
+        if name not in REFERENCE_TYPES:
+            raise ValueError(f"Unsupported reference type: {name}")
+        header['reference_type'] = name
+        arrays.update({f"reference/{k}": v for k, v in reference.to_arrays().items()})
+    save_artifact(path, arrays, header)
+
+def load_profile(path: str, mmap: bool = True, verify: bool = True) -> tuple:
+    """
+    Load a profile written by save_profile.
+    
+    With mmap=True the tables and reference arrays are read-only views into
+    the file, so loading costs a header parse (plus the checksum pass when
+    verify=True).
+    
+    Args:
+        path: Artifact path.
+        mmap: Memory-map the arrays instead of reading them.
+        verify: Check the artifact checksum.
+        
+    Returns:
+        calibrator: RlcsCalibrator, or None if none was saved.
+        reference: Reference object, or None if none was saved.
+        meta: User metadata.
+    """
+    arrays, header = load_artifact(path, mmap=mmap, verify=verify)
+
+    def section(prefix):
+        return {k[len(prefix):]: v for k, v in arrays.items() if k.startswith(prefix)}
+        
+    calibrator = None
+    if header['has_calibrator']:
+        calibrator = RlcsCalibrator.from_arrays(section("calibrator/"))
+    reference = None
+    if header['reference_type'] is not None:
+        reference = REFERENCE_TYPES[header['reference_type']].from_arrays(section("reference/"))
+    return calibrator, reference, header['meta']
@@ -5,14 +5,47 @@ Provides non-parametric quantile estimation for calibration.
 """
 
 import numpy as np
+from scipy.special import ndtr, ndtri
 
-def estimate_quantiles(data: np.ndarray, num_quantiles: int = 1000) -> tuple[np.ndarray, np.ndarray]:
+def quantile_grid(num_quantiles: int, grid: str = 'uniform', epsilon: float = 1e-6) -> np.ndarray:
+    """
+    Build the probability levels at which reference quantiles are taken.
+    
+    'uniform' spaces levels evenly in probability, which leaves only a few
+    knots beyond the 3-sigma decision thresholds. 'normal' spaces them
+    evenly in Z between ndtri(epsilon) and ndtri(1 - epsilon) (plus the
+    0 and 1 endpoints), so every sigma of the calibrated scale gets the
+    same number of knots.
+    
+    Args:
+        num_quantiles: Number of levels (>= 3 for 'normal').
+        grid: 'uniform' or 'normal'.
+        epsilon: Tail clamp of the 'normal' grid.
+        
+    Returns:
+        Strictly increasing levels in [0, 1], starting at 0 and ending at 1.
+        
+    Raises:
+        ValueError: If grid is unknown or num_quantiles is too small.
+    """
+    if grid == 'uniform':
+        return np.linspace(0, 1, num_quantiles)
+    if grid == 'normal':
+        if num_quantiles < 3:
+            raise ValueError("The normal grid needs at least 3 quantiles.")
+        z_max = ndtri(1.0 - epsilon)
+        return np.concatenate([[0.0], ndtr(np.linspace(-z_max, z_max, num_quantiles - 2)), [1.0]])
+    raise ValueError(f"Unknown quantile grid: {grid}")
+
+def estimate_quantiles(data: np.ndarray, num_quantiles: int = 1000,
+                       grid: str = 'uniform') -> tuple[np.ndarray, np.ndarray]:
     """
     Compute empirical quantiles from reference data.
     
     Args:
         data: Reference data array (n_samples,).
         num_quantiles: Number of quantile bins.
+        grid: Spacing of the quantile levels (see quantile_grid).
         
     Returns:
         quantiles: Quantile probability levels (0 to 1).
@@ -21,12 +54,36 @@ def estimate_quantiles(data: np.ndarray, num_quantiles: int = 1000) -> tuple[np.
     if len(data) == 0:
         raise ValueError("Cannot estimate quantiles from empty data.")
         
-    # Use linspace for quantiles
-    q = np.linspace(0, 1, num_quantiles)
+    q = quantile_grid(num_quantiles, grid)
     values = np.quantile(data, q)
     
     return q, values
 
+def mix_quantiles(quantiles: np.ndarray, tables: list, weights) -> np.ndarray:
+    """
+    Quantile values of a weighted mixture of quantile tables.
+    
+    Each table defines a piecewise-linear CDF; the mixture CDF is evaluated
+    on the union of all table values and inverted at `quantiles`. Cost is
+    O(m log m) for m total knots, independent of the underlying sample sizes.
+    
+    Args:
+        quantiles: Probability levels to evaluate (increasing).
+        tables: List of (quantiles_i, values_i) tables.
+        weights: Non-negative mixture weights (e.g. sample counts).
+        
+    Returns:
+        Mixture values at `quantiles`.
+    """
+    weights = np.asarray(weights, dtype=float)
+    weights = weights / weights.sum()
+    support = np.unique(np.concatenate([vals for _, vals in tables]))
+    cdf = np.zeros_like(support)
+    for (q, vals), w in zip(tables, weights):
+        cdf += w * np.interp(support, vals, q, left=0.0, right=1.0)
+    cdf = np.maximum.accumulate(cdf)
+    return np.interp(quantiles, cdf, support)
+
 def map_to_quantile(value: float, quantiles: np.ndarray, values: np.ndarray) -> float:
     """
     Map a raw value to its quantile rank (CDF value).
@@ -41,3 +98,64 @@ def map_to_quantile(value: float, quantiles: np.ndarray, values: np.ndarray) ->
     """
     # Use interpolation to find rank
     return np.interp(value, values, quantiles, left=0.0, right=1.0)
+
+def compile_z_table(quantiles: np.ndarray, values: np.ndarray, epsilon: float = 1e-6,
+                    resolution: float = 0.01) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compile a quantile table into a monotone raw -> Z-score lookup table.
+    
+    The calibration map raw -> rank (linear between quantile knots) ->
+    probit is sampled so that consecutive table knots are at most
+    `resolution` apart in Z. Linear interpolation in the returned table then
+    reproduces the exact map to within about `resolution` in Z, without
+    evaluating the inverse normal CDF at query time.
+    
+    Args:
+        quantiles: Quantile probability levels, strictly increasing.
+        values: Data values at those quantiles (m,), or a stack of such
+            tables (..., m) sharing the quantile levels.
+        epsilon: Rank clamp (Z is bounded by ndtri(1 - epsilon)).
+        resolution: Maximum Z spacing between table knots.
+        
+    Returns:
+        raw_knots: Raw score knots, non-decreasing (same leading shape as values).
+        z_knots: Z-scores at those knots, non-decreasing.
+    """
+    quantiles = np.asarray(quantiles, dtype=float)
+    values = np.asarray(values, dtype=float)
+    z = ndtri(np.clip(quantiles, epsilon, 1.0 - epsilon))
+    
+    # Sub-divide each quantile segment uniformly in Z
+    n_sub = np.maximum(np.ceil(np.diff(z) / resolution).astype(np.intp), 1)
+    seg = np.repeat(np.arange(len(quantiles) - 1), n_sub)
+    first = np.repeat(np.cumsum(n_sub) - n_sub, n_sub)
+    frac = (np.arange(len(seg)) - first) / n_sub[seg]
+    
+    z_sub = z[seg] + frac * (z[seg + 1] - z[seg])
+    q_sub = np.clip(ndtr(z_sub), quantiles[seg], quantiles[seg + 1])
+    weight = (q_sub - quantiles[seg]) / (quantiles[seg + 1] - quantiles[seg])
+    raw_sub = values[..., seg] + weight * (values[..., seg + 1] - values[..., seg])
+    
+    return np.concatenate([raw_sub, values[..., -1:]], axis=-1), np.append(z_sub, z[-1])
+
+def invert_z_table(raw_knots: np.ndarray, z_knots: np.ndarray, z_threshold: float):
+    """
+    Find the raw cutoff at which a compiled table crosses z_threshold.
+    
+    Args:
+        raw_knots: Raw knots (m,), or a stack (..., m) sharing z_knots.
+        z_knots: Z knots (m,), non-decreasing.
+        z_threshold: Threshold in Z units.
+        
+    Returns:
+        Cutoff with the leading shape of raw_knots; -inf / inf when the
+        threshold lies below / at or above the table.
+    """
+    raw_knots = np.asarray(raw_knots, dtype=float)
+    i = int(np.searchsorted(z_knots, z_threshold, side='right'))
+    if i == 0:
+        return np.full(raw_knots.shape[:-1], -np.inf)
+    if i == len(z_knots):
+        return np.full(raw_knots.shape[:-1], np.inf)
+    frac = (z_threshold - z_knots[i - 1]) / (z_knots[i] - z_knots[i - 1])
+    return raw_knots[..., i - 1] + frac * (raw_knots[..., i] - raw_knots[..., i - 1])
@@ -0,0 +1,258 @@
+"""
+Profile Registry.
+
+Serves per-tenant reference profiles (reference population + calibrator)
+for multi-tenant RLCS evaluation, loading them lazily from profile
+artifacts and keeping a bounded LRU cache in memory.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from resed.calibration.profile import load_profile
+from resed.rlcs.control_surface import rlcs_control_codes
+from resed.rlcs.sensors.temporal import stream_temporal_consistency
+
+class ReferenceProfile:
+    """
+    A loaded tenant profile.
+    
+    Attributes:
+        calibrator: RlcsCalibrator, or None.
+        reference: Reference object, or None.
+        meta (dict): Profile metadata.
+        nbytes (int): Size of the backing artifact.
+    """
+
+    def __init__(self, calibrator, reference, meta: dict, nbytes: int):
+        self.calibrator = calibrator
+        self.reference = reference
+        self.meta = meta
+        self.nbytes = nbytes
+
+class ProfileRegistry:
+    """
+    Lazily loaded, size-bounded LRU cache of tenant profiles.
+    
+    Profiles are resolved from explicit registrations or from
+    `<root>/<tenant_id><suffix>`, loaded with load_profile on first use and
+    evicted least-recently-used first once more than max_profiles are
+    cached or their artifacts exceed max_bytes in total (the most recent
+    profile is always kept). Lookups are thread-safe; artifacts are read
+    outside the registry lock, so a slow load only blocks callers waiting
+    on the same tenant.
+    
+    Attributes:
+        max_profiles (int): Maximum number of cached profiles.
+        max_bytes (int | None): Maximum total artifact size of cached profiles.
+    """
+
+    def __init__(self, root: str = None, suffix: str = ".bin", max_profiles: int = 64,
+                 max_bytes: int = None, mmap: bool = True, verify: bool = True):
+        """
+        Initialize an empty registry.
+        
+        Args:
+            root: Directory searched for unregistered tenants.
+            suffix: File suffix of profiles under root.
+            max_profiles: Maximum number of cached profiles.
+            max_bytes: Maximum total artifact bytes of cached profiles.
+            mmap: Memory-map profile arrays (see load_profile).
+            verify: Verify profile checksums on load.
+            
+        Raises:
+            ValueError: If max_profiles is not positive.
+        """
+        if max_profiles <= 0:
+            raise ValueError(f"max_profiles must be positive, got {max_profiles}")
+        self.root = root
+        self.suffix = suffix
+        self.max_profiles = max_profiles
+        self.max_bytes = max_bytes
+        self.mmap = mmap
+        self.verify = verify
+        self._paths = {}
+        self._cache = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._tenant_keys = {}
+
+    def register(self, tenant_id, path: str):
+        """
+        Map a tenant to a profile artifact (drops any cached copy).
+        
+        Args:
+            tenant_id: Tenant identifier.
+            path: Path to a profile written by save_profile.
+        """
+        with self._lock:
+            self._paths[tenant_id] = path
+            self._evict_one(tenant_id)
+
+    def path(self, tenant_id) -> str:
+        """
+        Resolve the artifact path of a tenant.
+        
+        Raises:
+            KeyError: If the tenant is neither registered nor found under root.
+        """
+        if tenant_id in self._paths:
+            return self._paths[tenant_id]
+        if self.root is not None:
+            path = os.path.join(self.root, f"{tenant_id}{self.suffix}")
+            if os.path.exists(path):
+                return path
+        raise KeyError(f"No profile for tenant {tenant_id!r}")
+
+    def get(self, tenant_id) -> ReferenceProfile:
+        """
+        Return a tenant's profile, loading it on a cache miss.
+        
+        Args:
+            tenant_id: Tenant identifier.
+            
+        Returns:
+            ReferenceProfile.
+            
+        Raises:
+            KeyError: If no profile exists for the tenant.
+        """
+        with self._lock:
+            profile = self._cached(tenant_id)
+            if profile is not None:
+                return profile
+            path = self.path(tenant_id)
+            loading = self._loading.setdefault(tenant_id, threading.Lock())
+            
+        # Load outside the registry lock; the per-tenant lock keeps
+        # concurrent misses on the same tenant from loading it twice.
+        with loading:
+            with self._lock:
+                profile = self._cached(tenant_id)
+            if profile is not None:
+                return profile
+            try:
+                calibrator, reference, meta = load_profile(path, mmap=self.mmap, verify=self.verify)
+                profile = ReferenceProfile(calibrator, reference, meta, os.path.getsize(path))
+            finally:
+                with self._lock:
+                    if self._loading.get(tenant_id) is loading:
+                        del self._loading[tenant_id]
+                        
+            with self._lock:
+                cached = self._cached(tenant_id)
+                if cached is not None:
+                    return cached
+                self._cache[tenant_id] = profile
+                self._nbytes += profile.nbytes
+                while len(self._cache) > 1 and (
+                    len(self._cache) > self.max_profiles
+                    or (self.max_bytes is not None and self._nbytes > self.max_bytes)
+                ):
+                    _, evicted = self._cache.popitem(last=False)
+                    self._nbytes -= evicted.nbytes
+                return profile
+
+    def _cached(self, tenant_id):
+        profile = self._cache.get(tenant_id)
+        if profile is not None:
+            self._cache.move_to_end(tenant_id)
+        return profile
+
+    def _stream_keys(self, tenant_ids: np.ndarray) -> np.ndarray:
+        """Integer stream key per row: the tenant id itself, or a per-registry key."""
+        if np.issubdtype(tenant_ids.dtype, np.integer):
+            return tenant_ids
+        tenants, inverse = np.unique(tenant_ids, return_inverse=True)
+        with self._lock:
+            keys = [self._tenant_keys.setdefault(tenant.item(), len(self._tenant_keys)) for tenant in tenants]
+        return np.asarray(keys, dtype=np.int64)[inverse]
+
+    def _evict_one(self, tenant_id):
+        profile = self._cache.pop(tenant_id, None)
+        if profile is not None:
+            self._nbytes -= profile.nbytes
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __contains__(self, tenant_id) -> bool:
+        return tenant_id in self._cache
+
+    @property
+    def nbytes(self) -> int:
+        """Total artifact size of the cached profiles."""
+        return self._nbytes
+
+    def dispatch(self, z: np.ndarray, tenant_ids: np.ndarray, s: np.ndarray = None,
+                 diagnostics: dict = None, **kwargs) -> np.ndarray:
+        """
+        Compute control signal codes for a batch mixing several tenants.
+        
+        Rows are grouped by tenant with one stable sort, and
+        rlcs_control_codes runs once per tenant group with that tenant's
+        calibrator and reference. Row-aligned inputs (z_prime, z_norms,
+        t_scores) are gathered per group. Temporal Consistency compares
+        each row with the previous row of the same stream: stream_ids if
+        given, otherwise the row's tenant. A temporal_sensor is measured
+        over the whole batch first and carries each stream's last latent
+        into the next dispatched batch.
+        
+        Args:
+            z: Latent representations (batch_size, d_z).
+            tenant_ids: Tenant id per row (batch_size,).
+            s: Statistical summary from encoder (batch_size, k).
+            diagnostics: Dictionary to populate with computed metrics, in row order.
+            **kwargs: Other rlcs_control_codes inputs shared by all tenants.
+            
+        Returns:
+            Signal codes (batch_size,) as uint8.
+            
+        Raises:
+            ValueError: If tenant_ids does not match the batch size.
+            KeyError: If a tenant has no profile.
+        """
+        tenant_ids = np.asarray(tenant_ids)
+        batch_size = z.shape[0]
+        if tenant_ids.shape != (batch_size,):
+            raise ValueError(f"tenant_ids shape {tenant_ids.shape} must be ({batch_size},)")
+            
+        temporal_sensor = kwargs.pop('temporal_sensor', None)
+        stream_ids = kwargs.pop('stream_ids', None)
+        if temporal_sensor is not None and stream_ids is None:
+            # One stream per tenant, so state never crosses tenants
+            stream_ids = self._stream_keys(tenant_ids)
+        if kwargs.get('t_scores', None) is None:
+            if temporal_sensor is not None:
+                kwargs['t_scores'] = temporal_sensor.measure(z, stream_ids=stream_ids)
+            elif stream_ids is not None:
+                kwargs['t_scores'] = stream_temporal_consistency(z, stream_ids)
+        row_inputs = {key: kwargs.pop(key) for key in ('z_prime', 'z_norms', 't_scores') if kwargs.get(key) is not None}
+        
+        tenants, inverse = np.unique(tenant_ids, return_inverse=True)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=len(tenants)))])
+        
+        codes = np.empty(batch_size, dtype=np.uint8)
+        for g, tenant in enumerate(tenants):
+            rows = order[bounds[g]:bounds[g + 1]]
+            profile = self.get(tenant.item())
+            group_kwargs = dict(kwargs)
+            for key, value in row_inputs.items():
+                group_kwargs[key] = value[rows]
+            if profile.reference is not None:
+                group_kwargs['reference'] = profile.reference
+                
+            group_diag = {} if diagnostics is not None else None
+            codes[rows] = rlcs_control_codes(
+                z[rows], None if s is None else s[rows], diagnostics=group_diag,
+                calibrator=profile.calibrator, **group_kwargs
+            )
+            if diagnostics is not None:
+                for key, value in group_diag.items():
+                    if key not in diagnostics:
+                        diagnostics[key] = np.full(batch_size, np.nan)
+                    diagnostics[key][rows] = value
+        return codes
@@ -6,9 +6,11 @@ Enforces a deterministic projection X -> Z and calculates a side-channel
 statistical summary S for the RLCS layer.
 """
 
+import os
 import numpy as np
+from scipy import sparse
 from resed.encoders.base import BaseEncoder
-from resed.utils.math import l2_norm
+from resed.encoders.statistics import STATISTIC_NAMES, LazyStatistics, compute_statistic
 
 class ResENC(BaseEncoder):
     """
@@ -38,6 +40,7 @@ class ResENC(BaseEncoder):
         self.phi = phi
         self._d_in = d_in
         self._d_z = d_z
+        self._pool = None
 
     def set_weights(self, W: np.ndarray, b: np.ndarray):
         """
@@ -58,61 +61,212 @@ class ResENC(BaseEncoder):
         self.W = W
         self.b = b
 
-    def _compute_statistics(self, z: np.ndarray) -> np.ndarray:
+    def _compute_statistics(self, z: np.ndarray, out: np.ndarray = None, work: tuple = None) -> np.ndarray:
         """
         Compute the statistical channel S for a batch of latent vectors.
         
         S_i = [norm(z_i), var(z_i), entropy_proxy(z_i), sparsity(z_i)]
         
+        All four statistics are row reductions over the whole batch. With
+        `out` and `work` supplied, every intermediate is written into those
+        buffers and nothing of batch size is allocated.
+        
         Args:
             z: Latent vectors (batch_size, d_z).
+            out: Optional output buffer (batch_size, 4).
+            work: Optional scratch buffers ((batch_size, d_z), (batch_size, d_z), (batch_size,)).
             
         Returns:
             S: Statistical summary (batch_size, 4).
         """
         batch_size = z.shape[0]
-        stats = np.zeros((batch_size, 4))
-        
-        for i in range(batch_size):
-            zi = z[i]
-            
-            norm_val = l2_norm(zi)
-            var_val = float(np.var(zi))
+        stats = np.empty((batch_size, 4)) if out is None else out
+        if work is None:
+            work = (np.empty_like(z), np.empty_like(z), np.empty(batch_size))
             
-            # Shannon entropy of softmax
-            exps = np.exp(zi - np.max(zi))
-            probs = exps / np.sum(exps)
-            log_probs = np.log(probs + 1e-12) 
-            entropy_val = -np.sum(probs * log_probs)
+        for j, name in enumerate(STATISTIC_NAMES):
+            compute_statistic(name, z, out=stats[:, j], work=work)
             
-            # Sparsity proxy (L1 norm / sqrt(d))
-            sparsity_val = float(np.sum(np.abs(zi))) / np.sqrt(self._d_z)
+        return stats
+
+    def _check_input(self, x: np.ndarray):
+        if x.ndim != 2:
+            raise ValueError(f"Expected 2D input (batch, d_in), got {x.ndim}D")
+        if x.shape[1] != self._d_in:
+            raise ValueError(f"Input dimension mismatch: expected {self._d_in}, got {x.shape[1]}")
+
+    def _project(self, x: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Z = phi(XW + b), with the bias and (ufunc) activation applied in place."""
+        if sparse.issparse(x):
+            # Sparse-dense product: cost scales with nnz, not batch_size x d_in
+            if x.format not in ('csr', 'csc'):
+                x = x.tocsr()
+            out[...] = x @ self.W
+        else:
+            np.matmul(x, self.W, out=out)
+        out += self.b
+        if isinstance(self.phi, np.ufunc):
+            self.phi(out, out=out)
+        else:
+            out[...] = self.phi(out)
+        return out
 
-            stats[i] = [norm_val, var_val, entropy_val, sparsity_val]
+    def _workspace(self, batch_size: int) -> tuple:
+        """Pooled buffers, grown to the largest batch seen and sliced per call."""
+        pool = self._pool
+        if pool is None or pool[0].shape[0] < batch_size:
+            pool = self._pool = (
+                np.empty((batch_size, self._d_z)),
+                np.empty((batch_size, 4)),
+                np.empty((batch_size, self._d_z)),
+                np.empty((batch_size, self._d_z)),
+                np.empty(batch_size),
+            )
+        return tuple(buf[:batch_size] for buf in pool)
+
+    def encode_into(self, x: np.ndarray, out: np.ndarray = None,
+                    stats_out: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Encode into caller-provided or pooled buffers.
+        
+        XW is written straight into `out`, the bias and activation are
+        applied in place, and the statistics are computed from that buffer
+        with pooled scratch space, so steady-state calls allocate nothing of
+        batch size. Buffers not supplied come from a pool owned by the
+        encoder and are overwritten by the next call (copy them to keep
+        them); the pool makes encode_into unsafe to share across threads.
+        
+        Args:
+            x: Input data (batch_size, d_in), dense or scipy.sparse.
+            out: Optional C-contiguous float64 latent buffer (batch_size, d_z).
+            stats_out: Optional float64 statistics buffer (batch_size, 4).
             
-        return stats
+        Returns:
+            Z: Latent representation (batch_size, d_z), `out` if given.
+            S: Statistical summary (batch_size, 4), `stats_out` if given.
+            
+        Raises:
+            ValueError: If x or a supplied buffer has incorrect shape or layout.
+        """
+        self._check_input(x)
+        batch_size = x.shape[0]
+        z_pool, s_pool, buf, buf2, row = self._workspace(batch_size)
+        
+        if out is None:
+            out = z_pool
+        elif out.shape != (batch_size, self._d_z) or out.dtype != np.float64 or not out.flags.c_contiguous:
+            raise ValueError(f"out must be a C-contiguous float64 array of shape {(batch_size, self._d_z)}")
+        if stats_out is None:
+            stats_out = s_pool
+        elif stats_out.shape != (batch_size, 4) or stats_out.dtype != np.float64:
+            raise ValueError(f"stats_out must be a float64 array of shape {(batch_size, 4)}")
+            
+        z = self._project(x, out)
+        s = self._compute_statistics(z, out=stats_out, work=(buf, buf2, row))
+        return z, s
 
-    def encode(self, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    def encode(self, x: np.ndarray, lazy: bool = False) -> tuple[np.ndarray, np.ndarray]:
         """
         Project inputs to latent space and return statistics.
         
         Args:
-            x: Input data (batch_size, d_in).
+            x: Input data (batch_size, d_in), dense or scipy.sparse (CSR and
+                CSC are used as-is, other formats are converted to CSR).
+            lazy: If True, return S as a LazyStatistics that computes each
+                statistic only when it is read.
             
         Returns:
             Z: Latent representation (batch_size, d_z).
-            S: Statistical summary (batch_size, 4).
+            S: Statistical summary (batch_size, 4), or LazyStatistics.
             
         Raises:
             ValueError: If x has incorrect shape.
         """
-        if x.ndim != 2:
-            raise ValueError(f"Expected 2D input (batch, d_in), got {x.ndim}D")
-        if x.shape[1] != self._d_in:
-            raise ValueError(f"Input dimension mismatch: expected {self._d_in}, got {x.shape[1]}")
+        self._check_input(x)
 
-        linear = np.dot(x, self.W) + self.b
-        z = self.phi(linear)
+        z = self._project(x, np.empty((x.shape[0], self._d_z)))
+        if lazy:
+            return z, LazyStatistics(z)
         s = self._compute_statistics(z)
         
-        return z, s
\ No newline at end of file
+        return z, s
+
+    def encode_iter(self, source, chunk_size: int = 65536, sink=None, stats_sink=None):
+        """
+        Encode a dataset chunk by chunk.
+        
+        Without sinks, each chunk yields freshly allocated (Z, S). With a
+        latent sink, Z is written straight into the sink rows through
+        encode_into, and S goes to stats_sink or, if that is not given, to
+        the encoder's pooled buffer (valid until the next chunk). With only
+        a stats_sink, Z is freshly allocated per chunk. Peak memory then
+        depends on chunk_size only, not on the dataset size.
+        
+        Args:
+            source: Array, np.memmap or scipy.sparse matrix (n, d_in; any
+                format, converted to CSR once), a path to a .npy file
+                (memory-mapped), or an iterable of (m_i, d_in) dense or
+                sparse chunks.
+            chunk_size: Rows per chunk for array sources.
+            sink: Optional latent output (n, d_z): a preallocated float64
+                array/np.memmap, or a .npy path to create (array sources only).
+            stats_sink: Optional statistics output (n, 4), same forms as sink.
+            
+        Yields:
+            (Z, S) per chunk, in input order.
+            
+        Raises:
+            ValueError: If a sink has the wrong shape, is given as a path
+                for an iterable source, or has more rows than the source.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            source = np.load(source, mmap_mode='r')
+        if sparse.issparse(source):
+            # Row slicing needs CSR (COO is not subscriptable, CSC slices slowly)
+            source = source.tocsr()
+        if hasattr(source, 'shape'):
+            n = source.shape[0]
+            chunks = (source[start:start + chunk_size] for start in range(0, n, chunk_size))
+        else:
+            n = None
+            chunks = iter(source)
+            
+        sink = self._open_sink(sink, n, self._d_z)
+        stats_sink = self._open_sink(stats_sink, n, 4)
+        
+        start = 0
+        for chunk in chunks:
+            x = chunk if sparse.issparse(chunk) else np.asarray(chunk)
+            stop = start + x.shape[0]
+            if sink is None and stats_sink is None:
+                z, s = self.encode(x)
+            else:
+                if (sink is not None and stop > sink.shape[0]) or (stats_sink is not None and stop > stats_sink.shape[0]):
+                    raise ValueError(f"Sink holds fewer rows than the source ({stop} needed)")
+                z, s = self.encode_into(
+                    x,
+                    out=np.empty((stop - start, self._d_z)) if sink is None else sink[start:stop],
+                    stats_out=None if stats_sink is None else stats_sink[start:stop],
+                )
+            yield z, s
+            start = stop
+            
+        for out in (sink, stats_sink):
+            if isinstance(out, np.memmap):
+                out.flush()
+        for out in (sink, stats_sink):
+            if out is not None and start != out.shape[0]:
+                raise ValueError(f"Source ended after {start} rows; the sink holds {out.shape[0]}")
+
+    @staticmethod
+    def _open_sink(sink, n: int, width: int):
+        """Create a .npy memmap for path sinks and check array sinks."""
+        if sink is None:
+            return None
+        if isinstance(sink, (str, os.PathLike)):
+            if n is None:
+                raise ValueError("Path sinks need an array source with a known length")
+            return np.lib.format.open_memmap(sink, mode='w+', dtype=np.float64, shape=(n, width))
+        if sink.ndim != 2 or sink.shape[1] != width or (n is not None and sink.shape[0] != n):
+            raise ValueError(f"Sink shape {sink.shape} must be ({n if n is not None else 'n'}, {width})")
+        return sink
@@ -0,0 +1,135 @@
+"""
+Statistical Channel.
+
+Row-reduction kernels for the resENC statistical channel
+S_i = [norm(z_i), var(z_i), entropy_proxy(z_i), sparsity(z_i)], and a
+lazy container that evaluates them on demand.
+"""
+
+import numpy as np
+
+def _norm(z: np.ndarray, out: np.ndarray, buf: np.ndarray, buf2: np.ndarray, row: np.ndarray):
+    np.einsum('ij,ij->i', z, z, out=row)
+    np.sqrt(row, out=out)
+
+def _variance(z: np.ndarray, out: np.ndarray, buf: np.ndarray, buf2: np.ndarray, row: np.ndarray):
+    np.mean(z, axis=1, out=row)
+    np.subtract(z, row[:, None], out=buf)
+    np.einsum('ij,ij->i', buf, buf, out=row)
+    np.divide(row, z.shape[1], out=out)
+
+def _entropy(z: np.ndarray, out: np.ndarray, buf: np.ndarray, buf2: np.ndarray, row: np.ndarray):
+    # Shannon entropy of softmax
+    np.max(z, axis=1, out=row)
+    np.subtract(z, row[:, None], out=buf)
+    np.exp(buf, out=buf)
+    np.sum(buf, axis=1, out=row)
+    np.divide(buf, row[:, None], out=buf)
+    np.add(buf, 1e-12, out=buf2)
+    np.log(buf2, out=buf2)
+    np.einsum('ij,ij->i', buf, buf2, out=row)
+    np.negative(row, out=out)
+
+def _sparsity(z: np.ndarray, out: np.ndarray, buf: np.ndarray, buf2: np.ndarray, row: np.ndarray):
+    # Sparsity proxy (L1 norm / sqrt(d))
+    np.abs(z, out=buf)
+    np.sum(buf, axis=1, out=row)
+    np.divide(row, np.sqrt(z.shape[1]), out=out)
+
+STATISTIC_NAMES = ('norm', 'variance', 'entropy', 'sparsity')
+_KERNELS = dict(zip(STATISTIC_NAMES, (_norm, _variance, _entropy, _sparsity)))
+# Number of (batch_size, d_z) scratch buffers each kernel writes
+_SCRATCH = {'norm': 0, 'variance': 1, 'entropy': 2, 'sparsity': 1}
+
+def compute_statistic(name: str, z: np.ndarray, out: np.ndarray = None, work: tuple = None) -> np.ndarray:
+    """
+    Compute one statistic of the channel for a batch of latents.
+
+    Args:
+        name: One of STATISTIC_NAMES.
+        z: Latent vectors (batch_size, d_z).
+        out: Optional output buffer (batch_size,), may be strided.
+        work: Optional scratch buffers ((batch_size, d_z), (batch_size, d_z), (batch_size,)).
+
+    Returns:
+        Statistic per row (batch_size,).
+
+    Raises:
+        ValueError: If the statistic is unknown.
+    """
+    if name not in _KERNELS:
+        raise ValueError(f"Unknown statistic: {name}. Expected one of {STATISTIC_NAMES}")
+    if out is None:
+        out = np.empty(z.shape[0])
+    if work is None:
+        n_scratch = _SCRATCH[name]
+        work = tuple(np.empty_like(z) if k < n_scratch else None for k in range(2)) + (np.empty(z.shape[0]),)
+    _KERNELS[name](z, out, *work)
+    return out
+
+class LazyStatistics:
+    """
+    Deferred statistical channel.
+
+    Holds a reference to the latents and computes each statistic on first
+    access, caching it. Consumers that never read S (e.g. rlcs_control) pay
+    nothing; np.asarray(s) materializes the full (batch_size, 4) matrix,
+    identical to the eager channel. The latents must not be modified while
+    statistics are still pending.
+
+    Attributes:
+        z (np.ndarray): Latent vectors (batch_size, d_z).
+    """
+
+    def __init__(self, z: np.ndarray):
+        self.z = z
+        self._cache = {}
+
+    @property
+    def shape(self) -> tuple:
+        return (self.z.shape[0], len(STATISTIC_NAMES))
+
+    def __len__(self) -> int:
+        return self.z.shape[0]
+
+    def get(self, name: str) -> np.ndarray:
+        """
+        Return one statistic (batch_size,), computing it on first use.
+
+        Args:
+            name: One of STATISTIC_NAMES.
+
+        Returns:
+            Cached statistic per row.
+        """
+        if name not in self._cache:
+            self._cache[name] = compute_statistic(name, self.z)
+        return self._cache[name]
+
+    def compute(self, names=None) -> np.ndarray:
+        """
+        Materialize a subset of the statistics as columns.
+
+        Args:
+            names: Statistic names in column order (default: all four).
+
+        Returns:
+            Statistics (batch_size, len(names)).
+        """
+        names = STATISTIC_NAMES if names is None else tuple(names)
+        out = np.empty((self.z.shape[0], len(names)))
+        for j, name in enumerate(names):
+            out[:, j] = self.get(name)
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        stats = self.compute()
+        return stats if dtype is None else stats.astype(dtype, copy=False)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.get(key)
+        # Column selections only evaluate the selected statistic
+        if isinstance(key, tuple) and len(key) == 2 and isinstance(key[1], (int, np.integer)):
+            return self.get(STATISTIC_NAMES[key[1]])[key[0]]
+        return self.compute()[key]
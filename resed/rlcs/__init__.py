@@ -5,6 +5,7 @@ Implements the control surface logic, sensors, and aggregation mechanisms
 inherited from the resLik architecture.
 """
 
-from .types import RlcsSignal
-from .sensors import population_consistency, temporal_consistency, agreement_consistency
-from .thresholds import TAU_D, TAU_T, TAU_A
\ No newline at end of file
+from .types import RlcsSignal, signals_from_codes, codes_from_signals
+from .sensors import population_consistency, temporal_consistency, agreement_consistency, fused_consistency
+from .sensors.temporal import TemporalSensor
+from .thresholds import TAU_D, TAU_T, TAU_A, TAU_K
@@ -0,0 +1,108 @@
+"""
+Out-of-Core RLCS Driver.
+
+Runs the RLCS sensors and control logic over latent arrays that do not fit
+in memory (memory-mapped .npy files), one bounded chunk at a time.
+Temporal state is carried across chunk boundaries.
+"""
+
+import os
+import numpy as np
+from resed.rlcs.control_surface import rlcs_control_codes
+from resed.rlcs.sensors.temporal import TemporalSensor
+
+SIGNALS_FILE = "signals.npy"
+
+def _open_array(source) -> np.ndarray:
+    """Open a .npy path as a read-only memmap; pass arrays through unchanged."""
+    if isinstance(source, (str, os.PathLike)):
+        return np.load(source, mmap_mode='r')
+    return source
+
+def rlcs_control_chunked(z, output_dir: str, chunk_size: int = 65536,
+                         calibrator=None, z_prime=None, stream_ids=None,
+                         **kwargs) -> dict:
+    """
+    Compute control signal codes and diagnostics for an out-of-core latent array.
+    
+    Peak memory is set by chunk_size (a few chunk_size x d_z buffers), not
+    by the dataset size. Outputs are written to memory-mapped .npy files in
+    output_dir: signals.npy (uint8 codes) and one float64 file per sensor
+    (population_consistency.npy, temporal_consistency.npy and, if z_prime is
+    given, agreement_consistency.npy; with a density_sensor,
+    density_consistency.npy).
+    
+    Args:
+        z: Latents (n, d_z) as a .npy path, np.memmap or array.
+        output_dir: Directory for the memory-mapped outputs.
+        chunk_size: Rows processed per chunk.
+        calibrator: Optional RlcsCalibrator instance to normalize scores.
+        z_prime: Optional alternate view (n, d_z), as path, memmap or array.
+        stream_ids: Optional stream id per row (n,), as path, memmap or array.
+        **kwargs: Passed to rlcs_control_codes (mu, sigma, fused, temporal_sensor,
+            reference, density_sensor).
+        
+    Returns:
+        Dictionary mapping 'signals' and sensor names to read/write memmaps.
+        
+    Raises:
+        ValueError: If inputs are not 2D or row counts disagree.
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        
+    z = _open_array(z)
+    if z.ndim != 2:
+        raise ValueError(f"Expected 2D latents (n, d_z), got {z.ndim}D")
+    n = z.shape[0]
+    
+    if z_prime is not None:
+        z_prime = _open_array(z_prime)
+        if z_prime.shape != z.shape:
+            raise ValueError(f"z_prime shape {z_prime.shape} must match z {z.shape}")
+    if stream_ids is not None:
+        stream_ids = _open_array(stream_ids)
+        if stream_ids.shape[0] != n:
+            raise ValueError(f"stream_ids length {stream_ids.shape[0]} must match {n} rows")
+            
+    # Carry temporal state across chunk boundaries
+    kwargs.setdefault('temporal_sensor', TemporalSensor())
+    
+    os.makedirs(output_dir, exist_ok=True)
+    names = ['population_consistency', 'temporal_consistency']
+    if z_prime is not None:
+        names.append('agreement_consistency')
+    if kwargs.get('density_sensor', None) is not None:
+        names.append('density_consistency')
+        
+    outputs = {
+        'signals': np.lib.format.open_memmap(
+            os.path.join(output_dir, SIGNALS_FILE), mode='w+', dtype=np.uint8, shape=(n,)
+        )
+    }
+    for name in names:
+        outputs[name] = np.lib.format.open_memmap(
+            os.path.join(output_dir, f"{name}.npy"), mode='w+', dtype=np.float64, shape=(n,)
+        )
+        
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        z_chunk = np.asarray(z[start:stop], dtype=float)
+        
+        chunk_kwargs = dict(kwargs)
+        if z_prime is not None:
+            chunk_kwargs['z_prime'] = np.asarray(z_prime[start:stop], dtype=float)
+        if stream_ids is not None:
+            chunk_kwargs['stream_ids'] = np.asarray(stream_ids[start:stop])
+            
+        diagnostics = {}
+        outputs['signals'][start:stop] = rlcs_control_codes(
+            z_chunk, None, diagnostics=diagnostics, calibrator=calibrator, **chunk_kwargs
+        )
+        for name in names:
+            outputs[name][start:stop] = diagnostics[name]
+            
+    for out in outputs.values():
+        out.flush()
+        
+    return outputs
@@ -1,16 +1,128 @@
 """
 Control Surface.
 
-Implements the core control surface logic (PROCEED, DEFER, ABSTAIN).
-
+Implements the core control surface logic (PROCEED, DEFER, ABSTAIN) as a
+reusable engine that evaluates large batches block-parallel on a thread pool.
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from resed.rlcs.control_surface import rlcs_control_codes
+from resed.rlcs.sensors.temporal import stream_temporal_consistency
+
 class ControlSurface:
     """
+    Reusable, thread-parallel RLCS engine.
+    
+    Splits a batch into fixed row blocks and evaluates sensors and decisions
+    for each block on a thread pool (NumPy releases the GIL inside its
+    norm, GEMM and exp kernels). The block partition depends only on
+    block_size, never on the thread count, and each block receives the
+    latent preceding it for Temporal Consistency, so outputs are identical
+    for any n_threads and match a single rlcs_control_codes call.
     
+    Stateful temporal inputs (temporal_sensor, stream_ids) are resolved
+    serially over the whole batch before the parallel phase.
+    
+    Attributes:
+        n_threads (int): Worker threads.
+        block_size (int): Rows per block.
+        calibrator: Optional RlcsCalibrator shared by all blocks.
+        context (dict): Default keyword context (mu, sigma, reference, ...).
     """
-    def __init__(self):
-        pass
+    
+    def __init__(self, n_threads: int = None, block_size: int = 65536, calibrator=None, **context):
+        """
+        Initialize the engine.
+        
+        Args:
+            n_threads: Worker threads (default: os.cpu_count()).
+            block_size: Rows per block.
+            calibrator: Optional RlcsCalibrator instance.
+            **context: Default rlcs_control_codes inputs (mu, sigma, fused,
+                reference, density_sensor, temporal_sensor).
+                
+        Raises:
+            ValueError: If block_size is not positive.
+        """
+        if block_size <= 0:
+            raise ValueError(f"block_size must be positive, got {block_size}")
+        self.n_threads = n_threads or os.cpu_count() or 1
+        self.block_size = block_size
+        self.calibrator = calibrator
+        self.context = context
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Shut down the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _map(self, fn, items):
+        if self.n_threads == 1 or len(items) == 1:
+            return [fn(item) for item in items]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_threads)
+        return list(self._executor.map(fn, items))
 
-    def evaluate(self, state):
-        raise NotImplementedError
+    def evaluate(self, z: np.ndarray, s: np.ndarray = None, diagnostics: dict = None, **kwargs) -> np.ndarray:
+        """
+        Compute control signal codes for a batch.
+        
+        Args:
+            z: Latent representations (batch_size, d_z).
+            s: Statistical summary from encoder (batch_size, k).
+            diagnostics: Dictionary to populate with computed metrics.
+            **kwargs: Per-call rlcs_control_codes inputs, overriding the context.
+            
+        Returns:
+            Signal codes (batch_size,) as uint8.
+        """
+        ctx = dict(self.context)
+        ctx.update(kwargs)
+        batch_size = z.shape[0]
+        
+        # Resolve stateful temporal inputs serially
+        temporal_sensor = ctx.pop('temporal_sensor', None)
+        stream_ids = ctx.pop('stream_ids', None)
+        if ctx.get('t_scores', None) is None:
+            if stream_ids is not None:
+                if temporal_sensor is not None:
+                    ctx['t_scores'] = temporal_sensor.measure(z, stream_ids=stream_ids)
+                else:
+                    ctx['t_scores'] = stream_temporal_consistency(z, stream_ids)
+            elif temporal_sensor is not None:
+                ctx['z_prev'] = temporal_sensor.z_prev
+                temporal_sensor.update(z)
+                
+        row_inputs = {key: ctx.pop(key) for key in ('z_prime', 'z_norms', 't_scores') if ctx.get(key) is not None}
+        z_prev = ctx.pop('z_prev', None)
+        starts = list(range(0, batch_size, self.block_size)) or [0]
+        
+        def run_block(start):
+            stop = min(start + self.block_size, batch_size)
+            block_kwargs = dict(ctx)
+            for key, value in row_inputs.items():
+                block_kwargs[key] = value[start:stop]
+            block_kwargs['z_prev'] = z[start - 1] if start > 0 else z_prev
+            
+            block_diag = {} if diagnostics is not None else None
+            codes = rlcs_control_codes(z[start:stop], None, diagnostics=block_diag,
+                                       calibrator=self.calibrator, **block_kwargs)
+            return codes, block_diag
+            
+        results = self._map(run_block, starts)
+        
+        if diagnostics is not None:
+            for key in results[0][1]:
+                diagnostics[key] = np.concatenate([diag[key] for _, diag in results])
+                
+        return np.concatenate([codes for codes, _ in results])
@@ -5,79 +5,208 @@ Implements the central control logic that maps diagnostics to control signals.
 """
 
 import numpy as np
-from resed.rlcs.types import RlcsSignal
-from resed.rlcs.thresholds import TAU_D, TAU_T, TAU_A
-from resed.rlcs.sensors import population_consistency, temporal_consistency, agreement_consistency
+from resed.rlcs.types import (
+    RlcsSignal,
+    SIGNAL_PROCEED,
+    SIGNAL_DOWNWEIGHT,
+    SIGNAL_DEFER,
+    SIGNAL_ABSTAIN,
+    signals_from_codes
+)
+from resed.rlcs.thresholds import TAU_D, TAU_T, TAU_A, TAU_K
+from resed.rlcs.sensors import (
+    population_consistency,
+    temporal_consistency,
+    agreement_consistency,
+    fused_consistency
+)
+from resed.rlcs.sensors.temporal import stream_temporal_consistency
 
-def rlcs_control(z: np.ndarray, s: np.ndarray, diagnostics: dict = None, calibrator=None, **kwargs) -> list[RlcsSignal]:
+# Diagnostic keys that may carry calibrated <sensor>_z companions
+SENSOR_NAMES = (
+    'population_consistency',
+    'temporal_consistency',
+    'agreement_consistency',
+    'density_consistency',
+)
+
+def rlcs_decide(d_scores: np.ndarray, t_scores: np.ndarray, a_scores: np.ndarray = None,
+                k_scores: np.ndarray = None, tau_d: float = TAU_D, tau_k: float = TAU_K) -> np.ndarray:
     """
-    Compute control signals for a batch of latent representations.
+    Vectorized decision kernel mapping sensor scores to signal codes.
     
-    Logic (Conservative OR):
-    1. ABSTAIN if Population Consistency > TAU_D
-    2. DEFER if Temporal Consistency < TAU_T
-    3. DOWNWEIGHT if Agreement Consistency < TAU_A
-    4. PROCEED otherwise
+    Applies the Conservative OR logic as priority-ordered masks: lower
+    priority signals are written first and overwritten by higher ones, so
+    ABSTAIN > DEFER > DOWNWEIGHT > PROCEED.
+    
+    Args:
+        d_scores: Population consistency (decision space) (batch_size,).
+        t_scores: Temporal consistency (batch_size,).
+        a_scores: Optional agreement consistency (batch_size,).
+        k_scores: Optional k-NN density consistency (batch_size,); joins
+            Population Consistency in triggering ABSTAIN.
+        tau_d: Population Consistency threshold (a raw cutoff when d_scores
+            are uncalibrated raw scores).
+        tau_k: Density Consistency threshold (likewise).
+        
+    Returns:
+        Signal codes (batch_size,) as uint8 (see resed.rlcs.types).
+    """
+    codes = np.full(np.shape(d_scores), SIGNAL_PROCEED, dtype=np.uint8)
+    
+    if a_scores is not None:
+        codes[a_scores < TAU_A] = SIGNAL_DOWNWEIGHT
+    codes[t_scores < TAU_T] = SIGNAL_DEFER
+    codes[d_scores > tau_d] = SIGNAL_ABSTAIN
+    if k_scores is not None:
+        codes[k_scores > tau_k] = SIGNAL_ABSTAIN
+    
+    return codes
+
+def rlcs_control_codes(z: np.ndarray, s: np.ndarray, diagnostics: dict = None, calibrator=None, **kwargs) -> np.ndarray:
+    """
+    Compute compact control signal codes for a batch of latent representations.
+    
+    Same semantics as rlcs_control, but returns a uint8 code array instead
+    of a list of RlcsSignal, avoiding per-sample Python objects.
     
     Args:
         z: Latent representations (batch_size, d_z).
         s: Statistical summary from encoder (batch_size, k).
-        diagnostics: Dictionary to populate with computed metrics.
+        diagnostics: Dictionary to populate with computed metrics (raw scores,
+            plus <sensor>_z Z-scores when a calibrator is applied).
         calibrator: Optional RlcsCalibrator instance to normalize scores.
-        **kwargs: Optional inputs (mu, sigma, z_prime).
+        **kwargs: Optional inputs (mu, sigma, z_prime, fused, z_norms,
+            z_prev, temporal_sensor, stream_ids, reference, density_sensor,
+            t_scores).
+            fused: If True, compute D/T/A with the single-pass fused kernel.
+            z_norms: Precomputed row norms of z reused by the fused kernel
+                (e.g. S[:, 0] from resENC).
+            z_prev: Latent preceding z[0] in the stream.
+            temporal_sensor: TemporalSensor carrying stream state across
+                calls; it is advanced past z.
+            stream_ids: Integer stream id per row for batches interleaving
+                independent sequences; temporal consistency is computed
+                per stream (and carried by temporal_sensor, if given).
+            reference: Reference object with a score(z) method (e.g.
+                WhitenedReference); replaces mu/sigma for Population
+                Consistency.
+            density_sensor: KnnDensitySensor adding k-NN Density
+                Consistency (ABSTAIN above TAU_K).
+            t_scores: Precomputed Temporal Consistency (batch_size,); skips
+                the temporal computation and leaves temporal_sensor untouched.
         
     Returns:
-        List of RlcsSignal, one per sample.
+        Signal codes (batch_size,) as uint8.
     """
-    batch_size = z.shape[0]
-    signals = []
-    
     # Defaults for reference stats
     mu = kwargs.get('mu', 0.0)
     sigma = kwargs.get('sigma', 1.0)
     z_prime = kwargs.get('z_prime', None)
     
-    # 1. Compute Diagnostics
-    d_scores = population_consistency(z, mu, sigma)
-    t_scores = temporal_consistency(z)
+    if z_prime is not None and z_prime.shape != z.shape:
+        raise ValueError(f"z_prime shape {z_prime.shape} must match z {z.shape}")
+    
+    t_given = kwargs.get('t_scores', None)
+    temporal_sensor = kwargs.get('temporal_sensor', None) if t_given is None else None
+    stream_ids = kwargs.get('stream_ids', None) if t_given is None else None
+    reference = kwargs.get('reference', None)
+    z_prev = temporal_sensor.z_prev if temporal_sensor is not None else kwargs.get('z_prev', None)
     
-    a_scores = None
-    if z_prime is not None:
-        if z_prime.shape != z.shape:
-            raise ValueError(f"z_prime shape {z_prime.shape} must match z {z.shape}")
-        a_scores = agreement_consistency(z, z_prime)
+    # 1. Compute Diagnostics
+    if kwargs.get('fused', False):
+        d_scores, t_scores, a_scores = fused_consistency(
+            z, mu, sigma, z_prime=z_prime, z_norms=kwargs.get('z_norms', None), z_prev=z_prev
+        )
+    else:
+        d_scores = None
+        if reference is None:
+            d_scores = population_consistency(z, mu, sigma)
+            
+        t_scores = None
+        if stream_ids is None and t_given is None:
+            t_scores = temporal_consistency(z, z_prev=z_prev)
+        
+        a_scores = None
+        if z_prime is not None:
+            a_scores = agreement_consistency(z, z_prime)
+            
+    if reference is not None:
+        d_scores = reference.score(z)
+        
+    k_scores = None
+    density_sensor = kwargs.get('density_sensor', None)
+    if density_sensor is not None:
+        k_scores = density_sensor.measure(z)
+        
+    if stream_ids is not None:
+        # Interleaved streams: compare each row with its own stream's predecessor
+        if temporal_sensor is not None:
+            t_scores = temporal_sensor.measure(z, stream_ids=stream_ids)
+        else:
+            t_scores = stream_temporal_consistency(z, stream_ids)
+    elif temporal_sensor is not None:
+        temporal_sensor.update(z)
+        
+    if t_given is not None:
+        t_scores = np.asarray(t_given, dtype=float)
         
     if diagnostics is not None:
         diagnostics['population_consistency'] = d_scores
         diagnostics['temporal_consistency'] = t_scores
         if a_scores is not None:
             diagnostics['agreement_consistency'] = a_scores
+        if k_scores is not None:
+            diagnostics['density_consistency'] = k_scores
             
     # 2. Calibration
-    d_decision = d_scores
-    t_decision = t_scores
-    a_decision = a_scores
+    tau_d = TAU_D
+    tau_k = TAU_K
     
     if calibrator is not None and calibrator.is_calibrated:
-        # Calibrate Population Consistency (unbounded distance) to Z-score
-        d_decision = calibrator.calibrate_batch('population_consistency', d_scores)
+        # The calibration map is monotone: comparing the calibrated Z-score
+        # with TAU equals comparing the raw score with the inverted cutoff.
+        tau_d = calibrator.raw_threshold('population_consistency', TAU_D)
+        if k_scores is not None:
+            tau_k = calibrator.raw_threshold('density_consistency', TAU_K)
+            
+        # Z-scores are only materialized when diagnostics are requested, for
+        # every sensor the calibrator was fitted on.
         # Note: Temporal and Agreement consistency are naturally bounded [0, 1]
-        # and are typically left uncalibrated to preserve absolute threshold semantics.
+        # and their decisions keep absolute thresholds; they only get Z-scores
+        # here if the calibrator was fitted on them.
+        # Calibrated per sensor: each <sensor>_z is its own contiguous array,
+        # with no stacked copy of the diagnostics.
+        if diagnostics is not None:
+            for name in SENSOR_NAMES:
+                if name in diagnostics and name in calibrator.tables:
+                    diagnostics[f"{name}_z"] = calibrator.calibrate_batch(name, diagnostics[name])
             
     # 3. Evaluate Control Logic
-    for i in range(batch_size):
-        if d_decision[i] > TAU_D:
-            signals.append(RlcsSignal.ABSTAIN)
-            continue
-            
-        if t_decision[i] < TAU_T:
-            signals.append(RlcsSignal.DEFER)
-            continue
-            
-        if a_decision is not None and a_decision[i] < TAU_A:
-            signals.append(RlcsSignal.DOWNWEIGHT)
-            continue
-            
-        signals.append(RlcsSignal.PROCEED)
+    return rlcs_decide(d_scores, t_scores, a_scores, k_scores, tau_d=tau_d, tau_k=tau_k)
+
+def rlcs_control(z: np.ndarray, s: np.ndarray, diagnostics: dict = None, calibrator=None, **kwargs) -> list[RlcsSignal]:
+    """
+    Compute control signals for a batch of latent representations.
+    
+    Logic (Conservative OR):
+    1. ABSTAIN if Population Consistency > TAU_D (or Density Consistency > TAU_K)
+    2. DEFER if Temporal Consistency < TAU_T
+    3. DOWNWEIGHT if Agreement Consistency < TAU_A
+    4. PROCEED otherwise
+    
+    Args:
+        z: Latent representations (batch_size, d_z).
+        s: Statistical summary from encoder (batch_size, k).
+        diagnostics: Dictionary to populate with computed metrics (raw scores,
+            plus <sensor>_z Z-scores when a calibrator is applied).
+        calibrator: Optional RlcsCalibrator instance to normalize scores.
+        **kwargs: Optional inputs (mu, sigma, z_prime, fused, z_norms,
+            z_prev, temporal_sensor, stream_ids, reference, density_sensor,
+            t_scores).
         
-    return signals
\ No newline at end of file
+    Returns:
+        List of RlcsSignal, one per sample.
+    """
+    codes = rlcs_control_codes(z, s, diagnostics=diagnostics, calibrator=calibrator, **kwargs)
+    return signals_from_codes(codes)
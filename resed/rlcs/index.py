@@ -0,0 +1,176 @@
+"""
+Approximate Nearest-Neighbour Index.
+
+Pure-NumPy inverted-file (IVF) index over a reference set of latents.
+A k-means coarse quantizer partitions the reference into lists; a query
+searches only the lists of its n_probe nearest centroids, using blocked
+GEMM distances.
+"""
+
+import numpy as np
+from resed.utils.math import squared_distances
+from resed.utils.stats import kmeans
+
+class IVFIndex:
+    """
+    Inverted-file index with a k-means coarse quantizer.
+    
+    Reference vectors are stored contiguously, grouped by list, so each
+    probed list is a single slice.
+    
+    Attributes:
+        centers (np.ndarray): Coarse centroids (n_lists, d).
+        vectors (np.ndarray): Reference vectors grouped by list (n, d).
+        ids (np.ndarray): Original row index of each stored vector (n,).
+        offsets (np.ndarray): List boundaries into vectors (n_lists + 1,).
+    """
+    
+    def __init__(self, centers: np.ndarray, vectors: np.ndarray, ids: np.ndarray, offsets: np.ndarray):
+        """
+        Initialize from built index arrays (see IVFIndex.build).
+        
+        Args:
+            centers: Coarse centroids (n_lists, d).
+            vectors: Reference vectors grouped by list (n, d).
+            ids: Original row index per stored vector (n,).
+            offsets: List boundaries (n_lists + 1,).
+        """
+        self.centers = np.asarray(centers, dtype=float)
+        self.vectors = np.asarray(vectors, dtype=float)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._sq_norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        self._center_sq_norms = np.einsum('ij,ij->i', self.centers, self.centers)
+
+    @classmethod
+    def build(cls, reference: np.ndarray, n_lists: int = None, n_iter: int = 25,
+              train_size: int = 65536, seed: int = 0) -> "IVFIndex":
+        """
+        Build the index from reference latents.
+        
+        Args:
+            reference: Reference latents (n, d).
+            n_lists: Number of inverted lists (default: ~sqrt(n)).
+            n_iter: k-means iterations for the coarse quantizer.
+            train_size: Maximum rows used to train the quantizer.
+            seed: Seed for training-sample selection and k-means.
+            
+        Returns:
+            Built IVFIndex.
+        """
+        reference = np.asarray(reference, dtype=float)
+        n = reference.shape[0]
+        if n_lists is None:
+            n_lists = max(1, int(np.sqrt(n)))
+            
+        rng = np.random.default_rng(seed)
+        train = reference
+        if n > train_size:
+            train = reference[np.sort(rng.choice(n, train_size, replace=False))]
+        centers, _ = kmeans(train, n_lists, n_iter=n_iter, seed=seed)
+        
+        index = cls(centers, np.zeros((0, reference.shape[1])), np.zeros(0), np.zeros(n_lists + 1))
+        labels = index._assign(reference, 1)[:, 0]
+        
+        order = np.argsort(labels, kind='stable')
+        counts = np.bincount(labels, minlength=n_lists)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return cls(centers, reference[order], order, offsets)
+
+    @property
+    def n_lists(self) -> int:
+        return self.centers.shape[0]
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def _assign(self, queries: np.ndarray, n_probe: int) -> np.ndarray:
+        """Return the n_probe nearest list ids per query (unordered)."""
+        coarse = squared_distances(queries, self.centers, self._center_sq_norms)
+        if n_probe >= self.n_lists:
+            return np.broadcast_to(np.arange(self.n_lists), coarse.shape)
+        return np.argpartition(coarse, n_probe - 1, axis=1)[:, :n_probe]
+
+    def search(self, queries: np.ndarray, k: int, n_probe: int = 8,
+               block_size: int = 4096) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximate k nearest reference vectors for each query.
+        
+        Queries are processed in blocks; within a block the loop runs over
+        probed lists (not queries), each list contributing one GEMM against
+        the queries that probe it. Slots not filled (fewer than k candidates)
+        hold distance inf and id -1.
+        
+        Args:
+            queries: Query latents (n_queries, d).
+            k: Number of neighbours.
+            n_probe: Lists searched per query.
+            block_size: Queries per block.
+            
+        Returns:
+            distances: Euclidean distances, ascending (n_queries, k).
+            ids: Reference row indices (n_queries, k).
+        """
+        queries = np.asarray(queries, dtype=float)
+        n = queries.shape[0]
+        distances = np.full((n, k), np.inf)
+        ids = np.full((n, k), -1, dtype=np.int64)
+        
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            qb = queries[start:stop]
+            probes = self._assign(qb, n_probe)
+            best_d = np.full((stop - start, k), np.inf)
+            best_i = np.full((stop - start, k), -1, dtype=np.int64)
+            
+            for lst in np.unique(probes):
+                lo, hi = self.offsets[lst], self.offsets[lst + 1]
+                if hi == lo:
+                    continue
+                rows = np.nonzero(np.any(probes == lst, axis=1))[0]
+                d = squared_distances(qb[rows], self.vectors[lo:hi], self._sq_norms[lo:hi])
+                
+                cand_d = np.hstack([best_d[rows], d])
+                cand_i = np.hstack([best_i[rows], np.broadcast_to(self.ids[lo:hi], d.shape)])
+                keep = np.argpartition(cand_d, k - 1, axis=1)[:, :k]
+                best_d[rows] = np.take_along_axis(cand_d, keep, axis=1)
+                best_i[rows] = np.take_along_axis(cand_i, keep, axis=1)
+                
+            order = np.argsort(best_d, axis=1)
+            distances[start:stop] = np.sqrt(np.take_along_axis(best_d, order, axis=1))
+            ids[start:stop] = np.take_along_axis(best_i, order, axis=1)
+            
+        return distances, ids
+
+    def to_arrays(self) -> dict:
+        """Return the index state as a dictionary of arrays."""
+        return {
+            'centers': self.centers,
+            'vectors': self.vectors,
+            'ids': self.ids,
+            'offsets': self.offsets,
+        }
+
+    def save(self, path: str):
+        """
+        Persist the index to an .npz file.
+        
+        Args:
+            path: Output path, used as given (no suffix is added).
+        """
+        with open(path, 'wb') as f:
+            np.savez(f, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """
+        Load an index saved with IVFIndex.save.
+        
+        Args:
+            path: Path to the .npz file.
+            
+        Returns:
+            Loaded IVFIndex.
+        """
+        with np.load(path) as data:
+            return cls(data['centers'], data['vectors'], data['ids'], data['offsets'])
@@ -0,0 +1,527 @@
+"""
+RLCS Reference Populations.
+
+Reference objects for Population Consistency that precompute and cache
+their whitening transform once per reference, so scoring a batch costs a
+single elementwise scale or triangular solve.
+"""
+
+import numpy as np
+from scipy.linalg import cholesky, solve_triangular
+from resed.utils.math import nearest_centers, squared_distances
+from resed.utils.stats import kmeans
+
+class WhitenedReference:
+    """
+    Reference population with a cached whitening transform.
+    
+    D_i = ||W (z_i - mu)||_2, where W is
+    - scalar:   1 / (sigma + epsilon)              (matches population_consistency)
+    - diagonal: diag(1 / (sigma_j + epsilon))
+    - full:     L^{-1}, with L L^T = Cov + ridge * I (Cholesky factor)
+    
+    Attributes:
+        mu (np.ndarray): Reference mean (d_z,).
+        mode (str): One of {'scalar', 'diagonal', 'full'}.
+        sigma (float | np.ndarray | None): Scalar or per-dimension scale.
+        cholesky_factor (np.ndarray | None): Lower-triangular L (full mode).
+    """
+    
+    def __init__(self, mu: np.ndarray, sigma: np.ndarray | float = None,
+                 cov: np.ndarray = None, ridge: float = 1e-6, epsilon: float = 1e-8):
+        """
+        Build the reference and factorize its whitening transform.
+        
+        Args:
+            mu: Reference mean (d_z,).
+            sigma: Scalar or per-dimension (d_z,) standard deviation.
+            cov: Full covariance (d_z, d_z); takes precedence over sigma.
+            ridge: Diagonal regularization added to cov before factorization.
+            epsilon: Stability constant for sigma.
+            
+        Raises:
+            ValueError: If shapes are inconsistent with mu.
+        """
+        self.mu = np.asarray(mu, dtype=float).reshape(-1)
+        self.epsilon = epsilon
+        self.sigma = None
+        self.cholesky_factor = None
+        self._inv_scale = None
+        d_z = self.mu.shape[0]
+        
+        if cov is not None:
+            cov = np.asarray(cov, dtype=float)
+            if cov.shape != (d_z, d_z):
+                raise ValueError(f"cov shape mismatch: expected {(d_z, d_z)}, got {cov.shape}")
+            self.mode = 'full'
+            self.cholesky_factor = cholesky(cov + ridge * np.eye(d_z), lower=True)
+        elif sigma is not None and np.ndim(sigma) > 0:
+            sigma = np.asarray(sigma, dtype=float).reshape(-1)
+            if sigma.shape != (d_z,):
+                raise ValueError(f"sigma shape mismatch: expected {(d_z,)}, got {sigma.shape}")
+            self.mode = 'diagonal'
+            self.sigma = sigma
+            self._inv_scale = 1.0 / (sigma + epsilon)
+        else:
+            self.mode = 'scalar'
+            self.sigma = 1.0 if sigma is None else float(sigma)
+            self._inv_scale = 1.0 / (self.sigma + epsilon)
+
+    @classmethod
+    def fit(cls, z: np.ndarray, mode: str = 'diagonal', ridge: float = 1e-6) -> "WhitenedReference":
+        """
+        Estimate a reference from clean latents.
+        
+        Args:
+            z: Reference latents (n_samples, d_z).
+            mode: One of {'scalar', 'diagonal', 'full'}. 'scalar' uses the
+                mean per-dimension standard deviation.
+            ridge: Diagonal regularization for 'full'.
+            
+        Returns:
+            Fitted WhitenedReference.
+            
+        Raises:
+            ValueError: If mode is unknown.
+        """
+        mu = np.mean(z, axis=0)
+        if mode == 'full':
+            return cls(mu, cov=np.cov(z, rowvar=False), ridge=ridge)
+        if mode == 'diagonal':
+            return cls(mu, sigma=np.std(z, axis=0))
+        if mode == 'scalar':
+            return cls(mu, sigma=float(np.mean(np.std(z, axis=0))))
+        raise ValueError(f"Unknown reference mode: {mode}")
+
+    def to_arrays(self) -> dict:
+        """Return the reference state (including the cached factor) as a dictionary of arrays."""
+        arrays = {'mu': self.mu, 'epsilon': np.asarray(self.epsilon)}
+        if self.mode == 'full':
+            arrays['cholesky_factor'] = self.cholesky_factor
+        else:
+            arrays['sigma'] = np.asarray(self.sigma)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "WhitenedReference":
+        """
+        Rebuild a reference from WhitenedReference.to_arrays without refactorizing.
+        
+        Args:
+            arrays: Dictionary of arrays (may be read-only memory maps).
+            
+        Returns:
+            WhitenedReference.
+        """
+        epsilon = float(arrays['epsilon'])
+        if 'cholesky_factor' not in arrays:
+            sigma = arrays['sigma']
+            return cls(arrays['mu'], sigma=sigma if np.ndim(sigma) > 0 else float(sigma), epsilon=epsilon)
+        reference = cls(arrays['mu'], epsilon=epsilon)
+        reference.mode = 'full'
+        reference.sigma = None
+        reference._inv_scale = None
+        reference.cholesky_factor = arrays['cholesky_factor']
+        return reference
+
+    def whiten(self, z: np.ndarray) -> np.ndarray:
+        """
+        Apply the cached whitening transform to centered latents.
+        
+        Args:
+            z: Latent vectors (batch_size, d_z).
+            
+        Returns:
+            Whitened residuals (batch_size, d_z).
+        """
+        diff = z - self.mu
+        if self.mode == 'full':
+            return solve_triangular(self.cholesky_factor, diff.T, lower=True, check_finite=False).T
+        diff *= self._inv_scale
+        return diff
+
+    def score(self, z: np.ndarray) -> np.ndarray:
+        """
+        Compute Population Consistency against this reference.
+        
+        Args:
+            z: Latent vectors (batch_size, d_z).
+            
+        Returns:
+            D: Consistency scores (batch_size,).
+        """
+        return np.linalg.norm(self.whiten(z), axis=1)
+
+class LowRankReference:
+    """
+    Low-rank plus isotropic reference population (probabilistic PCA style).
+    
+    Keeps the top-k principal directions V (k, d_z) with variances lambda_j
+    and a single residual variance sigma_r^2 for the orthogonal complement:
+    
+    D_i^2 = sum_j (v_j . r_i)^2 / lambda_j + (||r_i||^2 - ||V r_i||^2) / sigma_r^2,
+    with r_i = z_i - mu.
+    
+    Scoring costs O(d_z * k) per sample and storage is O(d_z * k), so no
+    d_z x d_z matrix is ever formed.
+    
+    Attributes:
+        mu (np.ndarray): Reference mean (d_z,).
+        components (np.ndarray): Principal directions (k, d_z), orthonormal rows.
+        variances (np.ndarray): Variance along each direction (k,).
+        residual_variance (float): Isotropic variance of the complement.
+        n_samples (int): Number of reference samples seen.
+    """
+    
+    def __init__(self, mu: np.ndarray, components: np.ndarray, variances: np.ndarray,
+                 residual_variance: float, n_samples: int = 0, epsilon: float = 1e-8):
+        """
+        Initialize from fitted parameters.
+        
+        Args:
+            mu: Reference mean (d_z,).
+            components: Principal directions (k, d_z).
+            variances: Variance per direction (k,).
+            residual_variance: Variance of the orthogonal complement.
+            n_samples: Number of reference samples.
+            epsilon: Floor for variances.
+        """
+        self.mu = np.asarray(mu, dtype=float).reshape(-1)
+        self.components = np.asarray(components, dtype=float)
+        self.variances = np.maximum(np.asarray(variances, dtype=float), epsilon)
+        self.residual_variance = max(float(residual_variance), epsilon)
+        self.n_samples = n_samples
+        self.epsilon = epsilon
+
+    @classmethod
+    def fit(cls, z: np.ndarray, n_components: int) -> "LowRankReference":
+        """
+        Fit from an in-memory reference.
+        
+        Args:
+            z: Reference latents (n_samples, d_z).
+            n_components: Number of principal directions k.
+            
+        Returns:
+            Fitted LowRankReference.
+        """
+        return cls.fit_stream([z], n_components)
+
+    @classmethod
+    def fit_stream(cls, chunks, n_components: int) -> "LowRankReference":
+        """
+        Fit from a stream of reference chunks (incremental SVD).
+        
+        Each chunk is merged with the current rank-k sketch (singular values
+        times directions, plus a mean-correction row) through a thin SVD, so
+        memory is O((k + chunk_size) * d_z) regardless of the stream length.
+        Per-dimension variances are accumulated exactly (Chan et al.) to
+        obtain the residual variance.
+        
+        Args:
+            chunks: Iterable of reference chunks (m_i, d_z), e.g. slices of a memmap.
+            n_components: Number of principal directions k (k < d_z).
+            
+        Returns:
+            Fitted LowRankReference.
+            
+        Raises:
+            ValueError: If the stream is empty or n_components is out of range.
+        """
+        n_seen = 0
+        mean = None
+        m2 = None
+        singular = None
+        directions = None
+        
+        for chunk in chunks:
+            x = np.asarray(chunk, dtype=float)
+            m = x.shape[0]
+            if m == 0:
+                continue
+            if mean is None:
+                d_z = x.shape[1]
+                if not 0 < n_components < d_z:
+                    raise ValueError(f"n_components must be in (0, {d_z}), got {n_components}")
+                mean = np.zeros(d_z)
+                m2 = np.zeros(d_z)
+                
+            chunk_mean = np.mean(x, axis=0)
+            centered = x - chunk_mean
+            chunk_m2 = np.einsum('ij,ij->j', centered, centered)
+            
+            n_total = n_seen + m
+            delta = chunk_mean - mean
+            if directions is None:
+                stacked = centered
+            else:
+                correction = np.sqrt(n_seen * m / n_total) * delta
+                stacked = np.vstack([singular[:, None] * directions, centered, correction[None, :]])
+                
+            m2 += chunk_m2 + delta ** 2 * n_seen * m / n_total
+            mean += delta * m / n_total
+            n_seen = n_total
+            
+            _, s, vt = np.linalg.svd(stacked, full_matrices=False)
+            singular = s[:n_components]
+            directions = vt[:n_components]
+            
+        if mean is None:
+            raise ValueError("Cannot fit reference from an empty stream.")
+            
+        dof = max(n_seen - 1, 1)
+        variances = singular ** 2 / dof
+        if len(variances) < n_components:
+            pad = n_components - len(variances)
+            variances = np.concatenate([variances, np.zeros(pad)])
+            directions = np.vstack([directions, np.zeros((pad, directions.shape[1]))])
+        total_variance = float(np.sum(m2)) / dof
+        d_z = mean.shape[0]
+        residual_variance = (total_variance - float(np.sum(variances))) / (d_z - n_components)
+        
+        return cls(mean, directions, variances, residual_variance, n_samples=n_seen)
+
+    def to_arrays(self) -> dict:
+        """Return the reference state as a dictionary of arrays."""
+        return {
+            'mu': self.mu,
+            'components': self.components,
+            'variances': self.variances,
+            'residual_variance': np.asarray(self.residual_variance),
+            'n_samples': np.asarray(self.n_samples),
+            'epsilon': np.asarray(self.epsilon),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "LowRankReference":
+        """
+        Rebuild a reference from LowRankReference.to_arrays.
+        
+        Args:
+            arrays: Dictionary of arrays (may be read-only memory maps).
+            
+        Returns:
+            LowRankReference.
+        """
+        return cls(arrays['mu'], arrays['components'], arrays['variances'],
+                   float(arrays['residual_variance']), n_samples=int(arrays['n_samples']),
+                   epsilon=float(arrays['epsilon']))
+
+    def score(self, z: np.ndarray) -> np.ndarray:
+        """
+        Compute Population Consistency against this reference.
+        
+        Args:
+            z: Latent vectors (batch_size, d_z).
+            
+        Returns:
+            D: Consistency scores (batch_size,).
+        """
+        diff = z - self.mu
+        proj = np.dot(diff, self.components.T)
+        proj_sq = np.square(proj)
+        
+        residual_sq = np.einsum('ij,ij->i', diff, diff) - np.sum(proj_sq, axis=1)
+        dist_sq = np.dot(proj_sq, 1.0 / self.variances) + np.maximum(residual_sq, 0.0) / self.residual_variance
+        
+        return np.sqrt(dist_sq)
+
+class MixtureReference:
+    """
+    Multi-modal reference population with a nearest-centroid index.
+    
+    Each mode k has its own mean mu_k and scalar sigma_k. A latent is scored
+    against its closest mode in normalized distance:
+    
+    D_i = min_k ||z_i - mu_k||_2 / (sigma_k + epsilon)
+    
+    The closest mode is found with blocked GEMM distances and an argmin.
+    With build_index, a coarse quantizer over the mode means restricts the
+    search to the modes of the n_probe nearest coarse cells.
+    
+    Attributes:
+        mus (np.ndarray): Mode means (n_modes, d_z).
+        sigmas (np.ndarray): Mode standard deviations (n_modes,).
+        coarse_centers (np.ndarray | None): Coarse cell centers (n_cells, d_z).
+        cell_modes (np.ndarray | None): Mode ids per cell, padded with -1 (n_cells, max_cell_size).
+    """
+    
+    def __init__(self, mus: np.ndarray, sigmas: np.ndarray, epsilon: float = 1e-8):
+        """
+        Initialize from per-mode parameters.
+        
+        Args:
+            mus: Mode means (n_modes, d_z).
+            sigmas: Mode standard deviations (n_modes,).
+            epsilon: Stability constant.
+            
+        Raises:
+            ValueError: If the number of sigmas does not match the modes.
+        """
+        self.mus = np.atleast_2d(np.asarray(mus, dtype=float))
+        self.sigmas = np.asarray(sigmas, dtype=float).reshape(-1)
+        if self.sigmas.shape[0] != self.mus.shape[0]:
+            raise ValueError(f"Expected {self.mus.shape[0]} sigmas, got {self.sigmas.shape[0]}")
+        self.epsilon = epsilon
+        self.coarse_centers = None
+        self.cell_modes = None
+        self.n_probe = None
+        self._scale = (self.sigmas + epsilon) ** 2
+        self._mu_sq = np.einsum('ij,ij->i', self.mus, self.mus)
+
+    @classmethod
+    def from_labels(cls, z: np.ndarray, labels: np.ndarray) -> "MixtureReference":
+        """
+        Build modes from labelled reference latents.
+        
+        sigma_k is the mean per-dimension standard deviation of mode k,
+        matching the scalar sigma used by population_consistency.
+        
+        Args:
+            z: Reference latents (n_samples, d_z).
+            labels: Integer mode label per row (n_samples,).
+            
+        Returns:
+            MixtureReference with one mode per distinct label.
+        """
+        labels = np.asarray(labels)
+        modes = np.unique(labels)
+        mus = np.stack([np.mean(z[labels == k], axis=0) for k in modes])
+        sigmas = np.array([np.mean(np.std(z[labels == k], axis=0)) for k in modes])
+        return cls(mus, sigmas)
+
+    @classmethod
+    def fit(cls, z: np.ndarray, n_modes: int, n_iter: int = 25, seed: int = 0) -> "MixtureReference":
+        """
+        Discover modes with k-means and build the mixture.
+        
+        Args:
+            z: Reference latents (n_samples, d_z).
+            n_modes: Number of modes.
+            n_iter: Maximum k-means iterations.
+            seed: Seed for k-means initialization.
+            
+        Returns:
+            Fitted MixtureReference.
+        """
+        _, labels = kmeans(z, n_modes, n_iter=n_iter, seed=seed)
+        return cls.from_labels(z, labels)
+
+    @property
+    def n_modes(self) -> int:
+        return self.mus.shape[0]
+
+    def build_index(self, n_cells: int, n_probe: int = 1, seed: int = 0):
+        """
+        Build a coarse-to-fine index over the mode means.
+        
+        Args:
+            n_cells: Number of coarse cells (e.g. ~sqrt(n_modes)).
+            n_probe: Default number of coarse cells searched per latent.
+            seed: Seed for the coarse k-means.
+        """
+        centers, assignment = kmeans(self.mus, n_cells, seed=seed)
+        counts = np.bincount(assignment, minlength=n_cells)
+        
+        cell_modes = np.full((n_cells, int(counts.max())), -1, dtype=np.intp)
+        order = np.argsort(assignment, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        slot = np.arange(self.n_modes) - starts[assignment[order]]
+        cell_modes[assignment[order], slot] = order
+        
+        self.coarse_centers = centers
+        self.cell_modes = cell_modes
+        self.n_probe = n_probe
+
+    def to_arrays(self) -> dict:
+        """Return the reference state (and coarse index, if built) as a dictionary of arrays."""
+        arrays = {'mus': self.mus, 'sigmas': self.sigmas, 'epsilon': np.asarray(self.epsilon)}
+        if self.coarse_centers is not None:
+            arrays['coarse_centers'] = self.coarse_centers
+            arrays['cell_modes'] = self.cell_modes
+            arrays['n_probe'] = np.asarray(self.n_probe)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict) -> "MixtureReference":
+        """
+        Rebuild a reference from MixtureReference.to_arrays.
+        
+        Args:
+            arrays: Dictionary of arrays (may be read-only memory maps).
+            
+        Returns:
+            MixtureReference.
+        """
+        reference = cls(arrays['mus'], arrays['sigmas'], epsilon=float(arrays['epsilon']))
+        if 'coarse_centers' in arrays:
+            reference.coarse_centers = arrays['coarse_centers']
+            reference.cell_modes = arrays['cell_modes']
+            reference.n_probe = int(arrays['n_probe'])
+        return reference
+
+    def nearest_modes(self, z: np.ndarray, n_probe: int = None, block_size: int = 4096) -> np.ndarray:
+        """
+        Find the closest mode (in normalized distance) for each latent.
+        
+        Args:
+            z: Latent vectors (batch_size, d_z).
+            n_probe: Coarse cells searched per latent (default: the value
+                set by build_index). Without an index, or when n_probe
+                covers every cell, all modes are searched exactly.
+            block_size: Rows per GEMM block.
+            
+        Returns:
+            Mode index per latent (batch_size,).
+        """
+        if n_probe is None:
+            n_probe = self.n_probe
+        if n_probe is None or self.coarse_centers is None or n_probe >= len(self.coarse_centers):
+            labels, _ = nearest_centers(z, self.mus, scale=self._scale, block_size=block_size)
+            return labels
+            
+        n = z.shape[0]
+        labels = np.zeros(n, dtype=np.intp)
+        for start in range(0, n, block_size):
+            stop = min(start + block_size, n)
+            zb = z[start:stop]
+            best = np.full(stop - start, np.inf)
+            best_mode = np.zeros(stop - start, dtype=np.intp)
+            
+            # Coarse: n_probe nearest cells per latent
+            coarse = squared_distances(zb, self.coarse_centers)
+            cells = np.argpartition(coarse, n_probe - 1, axis=1)[:, :n_probe]
+            
+            # Fine: one GEMM per probed cell against that cell's modes
+            for cell in np.unique(cells):
+                modes = self.cell_modes[cell]
+                modes = modes[modes >= 0]
+                if modes.shape[0] == 0:
+                    continue
+                rows = np.nonzero(np.any(cells == cell, axis=1))[0]
+                dists = squared_distances(zb[rows], self.mus[modes], self._mu_sq[modes])
+                dists /= self._scale[modes]
+                j = np.argmin(dists, axis=1)
+                d = dists[np.arange(rows.shape[0]), j]
+                closer = d < best[rows]
+                best[rows[closer]] = d[closer]
+                best_mode[rows[closer]] = modes[j[closer]]
+                
+            labels[start:stop] = best_mode
+            
+        return labels
+
+    def score(self, z: np.ndarray, n_probe: int = None) -> np.ndarray:
+        """
+        Compute Population Consistency against the closest mode.
+        
+        Args:
+            z: Latent vectors (batch_size, d_z).
+            n_probe: Coarse cells searched per latent (see nearest_modes).
+            
+        Returns:
+            D: Consistency scores (batch_size,).
+        """
+        labels = self.nearest_modes(z, n_probe=n_probe)
+        dist = np.linalg.norm(z - self.mus[labels], axis=1)
+        return dist / (self.sigmas[labels] + self.epsilon)
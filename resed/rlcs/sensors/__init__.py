@@ -0,0 +1,151 @@
+"""
+RLCS Sensors.
+
+Implements deterministic sensing logic for the RLCS layer.
+"""
+
+import numpy as np
+
+def population_consistency(z: np.ndarray, mu: np.ndarray | float, sigma: float, epsilon: float = 1e-8) -> np.ndarray:
+    """
+    Compute Population Consistency (ResLik-style).
+    
+    D_i = ||z_i - mu||_2 / (sigma + epsilon)
+    
+    Args:
+        z: Latent vectors (batch_size, d_z).
+        mu: Reference mean (vector or scalar).
+        sigma: Reference standard deviation (scalar).
+        epsilon: Stability constant.
+        
+    Returns:
+        D: Consistency scores (batch_size,).
+    """
+    diff = z - mu
+    dist = np.linalg.norm(diff, axis=1)
+    
+    return dist / (sigma + epsilon)
+
+def temporal_consistency(z: np.ndarray, z_prev: np.ndarray = None) -> np.ndarray:
+    """
+    Compute Temporal Consistency.
+    
+    T_i = exp(-||z_i - z_{i-1}||_2)
+    
+    Defined only for sequential inputs.
+    First element defaults to 1 unless the preceding latent is supplied.
+    
+    Args:
+        z: Latent vectors (batch_size, d_z).
+        z_prev: Optional latent preceding z[0] in the stream (d_z,).
+        
+    Returns:
+        T: Temporal consistency scores (batch_size,).
+    """
+    batch_size = z.shape[0]
+    t_scores = np.ones(batch_size, dtype=float)
+    
+    if batch_size > 1:
+        z_curr = z[1:]
+        z_last = z[:-1]
+        diff = z_curr - z_last
+        dists = np.linalg.norm(diff, axis=1)
+        
+        t_scores[1:] = np.exp(-dists)
+        
+    if z_prev is not None and batch_size > 0:
+        diff = z[:1] - z_prev
+        t_scores[0] = np.exp(-np.linalg.norm(diff, axis=1)[0])
+        
+    return t_scores
+
+def agreement_consistency(z: np.ndarray, z_prime: np.ndarray, epsilon: float = 1e-8) -> np.ndarray:
+    """
+    Compute Agreement Consistency.
+    
+    A_i = (z_i . z'_i) / (||z_i|| ||z'_i|| + epsilon)
+    
+    Args:
+        z: Primary latent vectors (batch_size, d_z).
+        z_prime: Alternate view latent vectors (batch_size, d_z).
+        epsilon: Stability constant.
+        
+    Returns:
+        A: Agreement scores (batch_size,).
+    """
+    dot_products = np.sum(z * z_prime, axis=1)
+    
+    norm_z = np.linalg.norm(z, axis=1)
+    norm_z_prime = np.linalg.norm(z_prime, axis=1)
+    
+    return dot_products / (norm_z * norm_z_prime + epsilon)
+
+
+def fused_consistency(z: np.ndarray, mu: np.ndarray | float = 0.0, sigma: float = 1.0,
+                      z_prime: np.ndarray = None, z_norms: np.ndarray = None,
+                      z_prev: np.ndarray = None, epsilon: float = 1e-8) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    """
+    Compute Population, Temporal and Agreement Consistency in a single fused pass.
+    
+    All distances are expanded through the norm identity
+    ||a - b||^2 = ||a||^2 - 2 a.b + ||b||^2, so only row-wise dot products
+    are evaluated and no (batch_size, d_z) difference temporaries are
+    allocated. Row norms are shared across the three sensors and can be
+    supplied from the encoder statistics channel (S[:, 0]).
+    
+    The expansion trades a little precision for memory: when a distance is
+    much smaller than the norms involved, cancellation limits its relative
+    accuracy to roughly sqrt(machine epsilon) * ||z||.
+    
+    Args:
+        z: Latent vectors (batch_size, d_z).
+        mu: Reference mean (vector or scalar).
+        sigma: Reference standard deviation (scalar).
+        z_prime: Optional alternate view latent vectors (batch_size, d_z).
+        z_norms: Optional precomputed L2 norms of z (batch_size,).
+        z_prev: Optional latent preceding z[0] in the stream (d_z,).
+        epsilon: Stability constant.
+        
+    Returns:
+        D: Population consistency scores (batch_size,).
+        T: Temporal consistency scores (batch_size,).
+        A: Agreement scores (batch_size,), or None if z_prime is not given.
+    """
+    batch_size, d_z = z.shape
+    
+    if z_norms is None:
+        z_sq = np.einsum('ij,ij->i', z, z)
+    else:
+        z_sq = np.square(z_norms, dtype=float)
+        
+    # Population: ||z - mu||^2 = ||z||^2 - 2 z.mu + ||mu||^2
+    mu = np.asarray(mu, dtype=float)
+    if mu.ndim == 0:
+        cross = mu * np.sum(z, axis=1)
+        mu_sq = float(mu) ** 2 * d_z
+    else:
+        cross = np.dot(z, mu)
+        mu_sq = float(np.dot(mu, mu))
+    dist_sq = z_sq - 2.0 * cross + mu_sq
+    d_scores = np.sqrt(np.maximum(dist_sq, 0.0)) / (sigma + epsilon)
+    
+    # Temporal: ||z_i - z_{i-1}||^2 from adjacent row dot products
+    t_scores = np.ones(batch_size, dtype=float)
+    if batch_size > 1:
+        adjacent = np.einsum('ij,ij->i', z[1:], z[:-1])
+        step_sq = z_sq[1:] + z_sq[:-1] - 2.0 * adjacent
+        t_scores[1:] = np.exp(-np.sqrt(np.maximum(step_sq, 0.0)))
+        
+    if z_prev is not None and batch_size > 0:
+        z_prev = np.asarray(z_prev, dtype=float).reshape(-1)
+        step_sq = z_sq[0] + np.dot(z_prev, z_prev) - 2.0 * np.dot(z[0], z_prev)
+        t_scores[0] = np.exp(-np.sqrt(max(step_sq, 0.0)))
+        
+    # Agreement: cosine similarity reusing ||z||
+    a_scores = None
+    if z_prime is not None:
+        dot_products = np.einsum('ij,ij->i', z, z_prime)
+        norm_z_prime = np.sqrt(np.einsum('ij,ij->i', z_prime, z_prime))
+        a_scores = dot_products / (np.sqrt(z_sq) * norm_z_prime + epsilon)
+        
+    return d_scores, t_scores, a_scores
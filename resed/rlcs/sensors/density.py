@@ -0,0 +1,114 @@
+"""
+Density Sensor.
+
+Measures how far a latent lies from the reference manifold via its
+distance to the k-th nearest reference latent, using an approximate
+nearest-neighbour index.
+"""
+
+import numpy as np
+from resed.rlcs.index import IVFIndex
+
+class KnnDensitySensor:
+    """
+    k-NN Density Consistency sensor.
+    
+    K_i = dist_k(z_i) / (scale + epsilon)
+    
+    where dist_k is the distance to the k-th nearest reference latent and
+    scale is the mean k-NN distance of reference latents to the rest of
+    the reference (self excluded). In-distribution latents score around 1.
+    
+    Attributes:
+        index (IVFIndex): Index over the reference latents.
+        k (int): Neighbour rank.
+        n_probe (int): Lists searched per query.
+        scale (float): Typical reference k-NN distance.
+    """
+    
+    def __init__(self, index: IVFIndex, k: int = 10, n_probe: int = 8,
+                 scale: float = 1.0, epsilon: float = 1e-8):
+        """
+        Initialize the sensor.
+        
+        Args:
+            index: Built IVFIndex over the reference.
+            k: Neighbour rank.
+            n_probe: Lists searched per query.
+            scale: Typical reference k-NN distance.
+            epsilon: Stability constant.
+        """
+        self.index = index
+        self.k = k
+        self.n_probe = n_probe
+        self.scale = float(scale)
+        self.epsilon = epsilon
+
+    @classmethod
+    def fit(cls, reference: np.ndarray, k: int = 10, n_lists: int = None, n_probe: int = 8,
+            scale_samples: int = 2048, seed: int = 0) -> "KnnDensitySensor":
+        """
+        Build the index and estimate the reference k-NN scale.
+        
+        Args:
+            reference: Reference latents (n, d_z).
+            k: Neighbour rank.
+            n_lists: Number of inverted lists (default: ~sqrt(n)).
+            n_probe: Lists searched per query.
+            scale_samples: Reference rows used to estimate the scale.
+            seed: Seed for index construction and scale sampling.
+            
+        Returns:
+            Fitted KnnDensitySensor.
+        """
+        reference = np.asarray(reference, dtype=float)
+        index = IVFIndex.build(reference, n_lists=n_lists, seed=seed)
+        sensor = cls(index, k=k, n_probe=n_probe)
+        
+        # Leave-one-out: the nearest hit of a reference row is itself
+        rng = np.random.default_rng(seed)
+        n = reference.shape[0]
+        rows = rng.choice(n, min(scale_samples, n), replace=False)
+        dists, _ = index.search(reference[rows], k + 1, n_probe=n_probe)
+        sensor.scale = float(np.mean(dists[:, k]))
+        
+        return sensor
+
+    def measure(self, z: np.ndarray) -> np.ndarray:
+        """
+        Compute k-NN Density Consistency scores.
+        
+        Args:
+            z: Latent vectors (batch_size, d_z).
+            
+        Returns:
+            K: Density consistency scores (batch_size,).
+        """
+        dists, _ = self.index.search(z, self.k, n_probe=self.n_probe)
+        return dists[:, -1] / (self.scale + self.epsilon)
+
+    def save(self, path: str):
+        """
+        Persist the sensor and its index to an .npz file.
+        
+        Args:
+            path: Output path, used as given (no suffix is added).
+        """
+        # Write through a handle so np.savez does not append '.npz' to the path
+        with open(path, 'wb') as f:
+            np.savez(f, k=self.k, n_probe=self.n_probe, scale=self.scale, **self.index.to_arrays())
+
+    @classmethod
+    def load(cls, path: str) -> "KnnDensitySensor":
+        """
+        Load a sensor saved with KnnDensitySensor.save.
+        
+        Args:
+            path: Path to the .npz file.
+            
+        Returns:
+            Loaded KnnDensitySensor.
+        """
+        with np.load(path) as data:
+            index = IVFIndex(data['centers'], data['vectors'], data['ids'], data['offsets'])
+            return cls(index, k=int(data['k']), n_probe=int(data['n_probe']), scale=float(data['scale']))
@@ -2,15 +2,234 @@
 Temporal Sensor.
 
 Monitors temporal consistency and drift.
-
+Carries stream state across batch boundaries so that chunked processing
+matches single-batch processing, for one stream or many interleaved streams.
 """
 
+import numpy as np
+from resed.rlcs.sensors import temporal_consistency
+
+class StreamStateTable:
+    """
+    Array-backed table holding the last latent of each stream.
+    
+    Keys are integer stream ids kept in a sorted index for vectorized
+    lookup (searchsorted); latents live in a preallocated (capacity, d_z)
+    array. When full, the least recently used streams are evicted.
+    
+    Attributes:
+        capacity (int): Maximum number of streams retained.
+        latents (np.ndarray | None): Slot storage (capacity, d_z), allocated on first store.
+        size (int): Number of occupied slots.
+    """
+    
+    def __init__(self, capacity: int = 65536):
+        """
+        Initialize an empty table.
+        
+        Args:
+            capacity: Maximum number of streams retained.
+            
+        Raises:
+            ValueError: If capacity is not positive.
+        """
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self.latents = None
+        self.size = 0
+        self._slot_keys = np.zeros(capacity, dtype=np.int64)
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._sorted_keys = np.zeros(0, dtype=np.int64)
+        self._sorted_slots = np.zeros(0, dtype=np.intp)
+        self._clock = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def lookup(self, stream_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Locate streams in the table.
+        
+        Args:
+            stream_ids: Integer stream ids (n,).
+            
+        Returns:
+            found: Boolean mask (n,) of ids present in the table.
+            slots: Slot index per id (n,); only meaningful where found.
+        """
+        stream_ids = np.asarray(stream_ids, dtype=np.int64)
+        if self.size == 0:
+            return np.zeros(stream_ids.shape, dtype=bool), np.zeros(stream_ids.shape, dtype=np.intp)
+            
+        pos = np.minimum(np.searchsorted(self._sorted_keys, stream_ids), self.size - 1)
+        found = self._sorted_keys[pos] == stream_ids
+        return found, self._sorted_slots[pos]
+
+    def store(self, stream_ids: np.ndarray, latents: np.ndarray, recency: np.ndarray):
+        """
+        Insert or overwrite the last latent of each stream.
+        
+        Args:
+            stream_ids: Unique integer stream ids (m,).
+            latents: Last latent per stream (m, d_z).
+            recency: Batch-relative recency per stream (m,); larger is more recent.
+        """
+        stream_ids = np.asarray(stream_ids, dtype=np.int64)
+        if len(stream_ids) == 0:
+            return
+        if self.latents is None:
+            self.latents = np.zeros((self.capacity, latents.shape[1]), dtype=float)
+            
+        ticks = self._clock + np.asarray(recency, dtype=np.int64)
+        self._clock = int(ticks.max()) + 1
+        
+        found, slots = self.lookup(stream_ids)
+        self.latents[slots[found]] = latents[found]
+        self._last_used[slots[found]] = ticks[found]
+        
+        new = ~found
+        if not np.any(new):
+            return
+            
+        new_ids = stream_ids[new]
+        new_latents = latents[new]
+        new_ticks = ticks[new]
+        if len(new_ids) > self.capacity:
+            keep = np.argsort(new_ticks, kind='stable')[-self.capacity:]
+            new_ids, new_latents, new_ticks = new_ids[keep], new_latents[keep], new_ticks[keep]
+            
+        n_new = len(new_ids)
+        n_free = self.capacity - self.size
+        free_slots = np.arange(self.size, self.size + min(n_free, n_new))
+        n_evict = n_new - len(free_slots)
+        if n_evict > 0:
+            victims = np.argpartition(self._last_used[:self.size], n_evict - 1)[:n_evict]
+            new_slots = np.concatenate([free_slots, victims])
+        else:
+            new_slots = free_slots
+            
+        self.size += len(free_slots)
+        self._slot_keys[new_slots] = new_ids
+        self._last_used[new_slots] = new_ticks
+        self.latents[new_slots] = new_latents
+        
+        order = np.argsort(self._slot_keys[:self.size], kind='stable')
+        self._sorted_keys = self._slot_keys[order]
+        self._sorted_slots = order
+
+def stream_temporal_consistency(z: np.ndarray, stream_ids: np.ndarray,
+                                state: StreamStateTable = None) -> np.ndarray:
+    """
+    Compute Temporal Consistency for a batch interleaving several streams.
+    
+    T_i = exp(-||z_i - z_prev(i)||_2), where z_prev(i) is the latest earlier
+    row of the same stream in the batch, or the stream's entry in `state`.
+    Rows without a predecessor default to 1. Rows are grouped by a stable
+    sort on stream id, so the cost is independent of the number of streams.
+    
+    Args:
+        z: Latent vectors (batch_size, d_z).
+        stream_ids: Integer stream id per row (batch_size,).
+        state: Optional StreamStateTable; read for predecessors and updated
+            with the last row of every stream in the batch.
+        
+    Returns:
+        T: Temporal consistency scores (batch_size,).
+        
+    Raises:
+        ValueError: If stream_ids does not match the batch size.
+    """
+    stream_ids = np.asarray(stream_ids).reshape(-1)
+    batch_size = z.shape[0]
+    if stream_ids.shape[0] != batch_size:
+        raise ValueError(f"stream_ids length {stream_ids.shape[0]} must match batch size {batch_size}")
+        
+    t_scores = np.ones(batch_size, dtype=float)
+    if batch_size == 0:
+        return t_scores
+        
+    order = np.argsort(stream_ids, kind='stable')
+    ids_sorted = stream_ids[order]
+    starts = np.ones(batch_size, dtype=bool)
+    starts[1:] = ids_sorted[1:] != ids_sorted[:-1]
+    
+    # Predecessor within the batch
+    cont = np.nonzero(~starts)[0]
+    if len(cont) > 0:
+        diff = z[order[cont]] - z[order[cont - 1]]
+        t_scores[order[cont]] = np.exp(-np.linalg.norm(diff, axis=1))
+        
+    if state is not None:
+        heads = np.nonzero(starts)[0]
+        found, slots = state.lookup(ids_sorted[heads])
+        if np.any(found):
+            rows = order[heads[found]]
+            diff = z[rows] - state.latents[slots[found]]
+            t_scores[rows] = np.exp(-np.linalg.norm(diff, axis=1))
+            
+        ends = np.append(heads[1:], batch_size) - 1
+        last_rows = order[ends]
+        state.store(ids_sorted[heads], z[last_rows], recency=last_rows)
+        
+    return t_scores
+
 class TemporalSensor:
     """
+    Stateful streaming Temporal Consistency sensor.
     
+    Keeps the last latent of the stream (O(d_z) state) and uses it as the
+    predecessor of the first row of the next batch. Feeding a sequence in
+    chunks of any size therefore yields the same scores as one batch.
+    
+    When stream ids are given, each row is compared with the previous latent
+    of its own stream, held in a StreamStateTable with LRU eviction.
+    
+    Attributes:
+        z_prev (np.ndarray | None): Last latent observed on the single stream.
+        streams (StreamStateTable): Per-stream state for keyed measurements.
     """
-    def __init__(self):
-        pass
+    
+    def __init__(self, capacity: int = 65536):
+        """
+        Initialize the sensor.
+        
+        Args:
+            capacity: Maximum number of keyed streams retained.
+        """
+        self.z_prev = None
+        self.capacity = capacity
+        self.streams = StreamStateTable(capacity)
+
+    def reset(self):
+        """Forget the carried stream state."""
+        self.z_prev = None
+        self.streams = StreamStateTable(self.capacity)
+
+    def update(self, time_series: np.ndarray):
+        """
+        Advance the single-stream state without scoring.
+        
+        Args:
+            time_series: Latent vectors (batch_size, d_z).
+        """
+        if time_series.shape[0] > 0:
+            self.z_prev = np.array(time_series[-1], dtype=float)
 
-    def measure(self, time_series):
-        raise NotImplementedError
+    def measure(self, time_series: np.ndarray, stream_ids: np.ndarray = None) -> np.ndarray:
+        """
+        Score a chunk of the stream(s) and advance the state.
+        
+        Args:
+            time_series: Latent vectors (batch_size, d_z).
+            stream_ids: Optional integer stream id per row (batch_size,).
+            
+        Returns:
+            T: Temporal consistency scores (batch_size,).
+        """
+        if stream_ids is not None:
+            return stream_temporal_consistency(time_series, stream_ids, state=self.streams)
+            
+        t_scores = temporal_consistency(time_series, z_prev=self.z_prev)
+        self.update(time_series)
+        return t_scores
@@ -13,3 +13,6 @@ TAU_T = 0.5
 
 # Agreement Consistency Threshold (Cosine similarity)
 TAU_A = 0.8
+
+# k-NN Density Consistency Threshold (multiple of typical reference k-NN distance)
+TAU_K = 3.0
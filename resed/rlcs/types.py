@@ -5,6 +5,7 @@ Defines the control signals and types for the Representation-Level Control Surfa
 """
 
 from enum import Enum
+import numpy as np
 
 class RlcsSignal(str, Enum):
     """
@@ -14,3 +15,38 @@ class RlcsSignal(str, Enum):
     DOWNWEIGHT = "DOWNWEIGHT"
     DEFER = "DEFER"
     ABSTAIN = "ABSTAIN"
+
+# Compact uint8 encoding of RlcsSignal, ordered by escalation severity.
+SIGNAL_PROCEED = 0
+SIGNAL_DOWNWEIGHT = 1
+SIGNAL_DEFER = 2
+SIGNAL_ABSTAIN = 3
+
+SIGNAL_TABLE = (RlcsSignal.PROCEED, RlcsSignal.DOWNWEIGHT, RlcsSignal.DEFER, RlcsSignal.ABSTAIN)
+
+_SIGNAL_LOOKUP = np.array(SIGNAL_TABLE, dtype=object)
+
+def signals_from_codes(codes: np.ndarray) -> list[RlcsSignal]:
+    """
+    Convert a uint8 signal-code array into a list of RlcsSignal.
+    
+    Args:
+        codes: Signal codes (batch_size,) with values in [0, 3].
+        
+    Returns:
+        List of RlcsSignal, one per code.
+    """
+    return _SIGNAL_LOOKUP[np.asarray(codes, dtype=np.intp)].tolist()
+
+def codes_from_signals(signals: list[RlcsSignal]) -> np.ndarray:
+    """
+    Convert a list of RlcsSignal into a uint8 signal-code array.
+    
+    Args:
+        signals: Control signals.
+        
+    Returns:
+        Signal codes (batch_size,).
+    """
+    index = {sig: code for code, sig in enumerate(SIGNAL_TABLE)}
+    return np.fromiter((index[RlcsSignal(sig)] for sig in signals), dtype=np.uint8, count=len(signals))
@@ -11,6 +11,7 @@ from resed.decoders.resdec import ResDEC
 from resed.restr.restr import ResTR
 from resed.system.governance import RlcsGovernance
 from resed.rlcs.types import RlcsSignal
+from resed.rlcs.sensors.temporal import TemporalSensor
 
 class ResEdBlock:
     """
@@ -20,7 +21,8 @@ class ResEdBlock:
     def __init__(self, d_in: int, d_z: int, d_out: int, 
                  n_heads: int = 4,
                  enc_phi=np.tanh, dec_psi=lambda x: x,
-                 attenuation_factor: float = 0.5):
+                 attenuation_factor: float = 0.5,
+                 stream_capacity: int = None):
         """
         Initialize the system block.
         
@@ -32,14 +34,18 @@ class ResEdBlock:
             enc_phi: Encoder activation.
             dec_psi: Decoder activation.
             attenuation_factor: Attenuation for DEFER signal.
+            stream_capacity: If set, keep per-stream temporal state for up to
+                this many streams across forward calls (LRU eviction).
         """
         self.encoder = ResENC(d_in, d_z, phi=enc_phi)
         self.restr = ResTR(d_z, n_heads)
         self.decoder = ResDEC(d_z, d_out, psi=dec_psi)
         self.governance = RlcsGovernance(attenuation_factor=attenuation_factor)
+        self.temporal_sensor = TemporalSensor(stream_capacity) if stream_capacity else None
         
     def forward(self, x: np.ndarray, 
                 nominal_alpha: float = 0.0, nominal_beta: float = 0.0,
+                stream_ids: np.ndarray = None,
                 **rlcs_kwargs) -> tuple[list, dict]:
         """
         Execute the pipeline: Enc -> RLCS -> resTR -> Dec.
@@ -48,16 +54,22 @@ class ResEdBlock:
             x: Input batch (batch_size, d_in).
             nominal_alpha: Desired attention refinement scale.
             nominal_beta: Desired FFN refinement scale.
+            stream_ids: Optional integer stream id per row, for batches that
+                interleave independent sequences.
             **rlcs_kwargs: Context for RLCS (mu, sigma, z_prime).
             
         Returns:
             outputs: List of outputs (np.ndarray or None).
             diagnostics: RLCS diagnostics dictionary.
         """
-        # 1. Encode
-        z_enc, s_enc = self.encoder.encode(x)
+        # 1. Encode (statistics are only computed if a consumer reads them)
+        z_enc, s_enc = self.encoder.encode(x, lazy=True)
         
         # 2. RLCS Governance (Diagnose)
+        if stream_ids is not None:
+            rlcs_kwargs['stream_ids'] = stream_ids
+            if self.temporal_sensor is not None:
+                rlcs_kwargs.setdefault('temporal_sensor', self.temporal_sensor)
         signals, diagnostics = self.governance.diagnose(z_enc, s_enc, **rlcs_kwargs)
         
         # 3. Execution (Route & Execute)
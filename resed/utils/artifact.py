@@ -0,0 +1,114 @@
+"""
+Binary Artifact Format.
+
+A versioned, checksummed container for named arrays that can be
+memory-mapped, so loading costs a header parse instead of a decompress.
+
+Layout:
+    magic (8 bytes) | version (uint32) | header length (uint32) |
+    JSON header | zero padding to ALIGNMENT | array data
+
+Each array starts on an ALIGNMENT-byte boundary of the data section. The
+header records dtype, shape and offset per array, free-form metadata, and
+the CRC32 of the whole data section.
+"""
+
+import json
+import struct
+import zlib
+import numpy as np
+
+MAGIC = b"RESEDART"
+VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sII")
+
+def _pad(n: int) -> int:
+    return -n % ALIGNMENT
+
+def save_artifact(path: str, arrays: dict, meta: dict = None):
+    """
+    Write named arrays and metadata to an artifact file.
+    
+    Args:
+        path: Output path.
+        arrays: Dictionary of {name: array}. Object dtypes are not supported.
+        meta: JSON-serializable metadata.
+        
+    Raises:
+        ValueError: If an array has object dtype.
+    """
+    entries = {}
+    blobs = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        if array.dtype.hasobject:
+            raise ValueError(f"Array '{name}' has object dtype and cannot be stored.")
+        entries[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        blob = array.tobytes()
+        blobs.append(blob + b"\0" * _pad(len(blob)))
+        offset += len(blobs[-1])
+        
+    data = b"".join(blobs)
+    header = json.dumps({
+        'arrays': entries,
+        'meta': meta or {},
+        'data_bytes': len(data),
+        'crc32': zlib.crc32(data),
+    }).encode("utf-8")
+    prefix = _PREFIX.pack(MAGIC, VERSION, len(header))
+    
+    with open(path, "wb") as f:
+        f.write(prefix)
+        f.write(header)
+        f.write(b"\0" * _pad(len(prefix) + len(header)))
+        f.write(data)
+
+def load_artifact(path: str, mmap: bool = True, verify: bool = True) -> tuple[dict, dict]:
+    """
+    Read an artifact written by save_artifact.
+    
+    Args:
+        path: Artifact path.
+        mmap: If True, arrays are read-only views into a memory map of the
+            file; pages are read on first touch.
+        verify: If True, check the data-section CRC32 (reads every page).
+        
+    Returns:
+        arrays: Dictionary of {name: array}.
+        meta: Metadata dictionary.
+        
+    Raises:
+        ValueError: If the file is not an artifact, has an unsupported
+            version, is truncated, or fails the checksum.
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"{path} is not a resED artifact (truncated prefix).")
+        magic, version, header_len = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a resED artifact (bad magic).")
+        if version != VERSION:
+            raise ValueError(f"Unsupported artifact version {version} (expected {VERSION}).")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        
+    data_start = _PREFIX.size + header_len + _pad(_PREFIX.size + header_len)
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+    data = buffer[data_start:]
+    if data.shape[0] != header['data_bytes']:
+        raise ValueError(f"{path} is truncated: expected {header['data_bytes']} data bytes, got {data.shape[0]}.")
+    if verify and zlib.crc32(data) != header['crc32']:
+        raise ValueError(f"{path} failed checksum verification.")
+        
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        dtype = np.dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        count = int(np.prod(shape))
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=entry['offset']).reshape(shape)
+    return arrays, header['meta']
@@ -62,4 +62,63 @@ def clip(x: np.ndarray, low: float, high: float) -> np.ndarray:
     Returns:
         Clipped array.
     """
-    return np.clip(x, low, high)
\ No newline at end of file
+    return np.clip(x, low, high)
+
+
+def squared_distances(x: np.ndarray, centers: np.ndarray, center_sq_norms: np.ndarray = None) -> np.ndarray:
+    """
+    Compute pairwise squared Euclidean distances with a single GEMM.
+    
+    ||x_i - c_j||^2 = ||x_i||^2 - 2 x_i . c_j + ||c_j||^2, clipped at zero.
+    
+    Args:
+        x: Query vectors (n, d).
+        centers: Center vectors (m, d).
+        center_sq_norms: Optional precomputed ||c_j||^2 (m,).
+        
+    Returns:
+        Squared distances (n, m).
+    """
+    if center_sq_norms is None:
+        center_sq_norms = np.einsum('ij,ij->i', centers, centers)
+    x_sq = np.einsum('ij,ij->i', x, x)
+    
+    dists = np.dot(x, centers.T)
+    dists *= -2.0
+    dists += x_sq[:, None]
+    dists += center_sq_norms[None, :]
+    return np.maximum(dists, 0.0, out=dists)
+
+def nearest_centers(x: np.ndarray, centers: np.ndarray, scale: np.ndarray = None,
+                    block_size: int = 4096) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the nearest center for each row using blocked GEMM distances.
+    
+    Rows are processed in blocks so the (block_size, m) distance matrix
+    bounds memory regardless of n.
+    
+    Args:
+        x: Query vectors (n, d).
+        centers: Center vectors (m, d).
+        scale: Optional per-center divisor applied to squared distances (m,).
+        block_size: Rows per block.
+        
+    Returns:
+        labels: Index of the nearest center per row (n,).
+        sq_dists: (Scaled) squared distance to that center (n,).
+    """
+    n = x.shape[0]
+    labels = np.zeros(n, dtype=np.intp)
+    sq_dists = np.zeros(n, dtype=float)
+    center_sq_norms = np.einsum('ij,ij->i', centers, centers)
+    
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        dists = squared_distances(x[start:stop], centers, center_sq_norms)
+        if scale is not None:
+            dists /= scale[None, :]
+        idx = np.argmin(dists, axis=1)
+        labels[start:stop] = idx
+        sq_dists[start:stop] = dists[np.arange(stop - start), idx]
+        
+    return labels, sq_dists
@@ -6,6 +6,7 @@ Supports ResLik, TCS, and Agreement sensors.
 """
 
 import numpy as np
+from resed.utils.math import nearest_centers
 
 def population_mean(x: np.ndarray) -> float:
     """
@@ -74,3 +75,55 @@ def rolling_difference(x_prev: np.ndarray, x_curr: np.ndarray) -> np.ndarray:
         Difference (x_curr - x_prev).
     """
     return x_curr - x_prev
+
+def kmeans(x: np.ndarray, n_clusters: int, n_iter: int = 25, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Deterministic Lloyd's k-means with blocked GEMM assignment.
+    
+    Centers are initialized from distinct random rows; empty clusters are
+    re-seeded with the rows farthest from their current center.
+    
+    Args:
+        x: Data (n_samples, d).
+        n_clusters: Number of clusters.
+        n_iter: Maximum Lloyd iterations.
+        seed: Seed for initialization.
+        
+    Returns:
+        centers: Cluster centers (n_clusters, d).
+        labels: Cluster index per row (n_samples,).
+        
+    Raises:
+        ValueError: If n_clusters exceeds the number of samples.
+    """
+    x = np.asarray(x, dtype=float)
+    n = x.shape[0]
+    if not 0 < n_clusters <= n:
+        raise ValueError(f"n_clusters must be in (0, {n}], got {n_clusters}")
+        
+    rng = np.random.default_rng(seed)
+    centers = x[rng.choice(n, n_clusters, replace=False)].copy()
+    labels = np.full(n, -1, dtype=np.intp)
+    
+    for _ in range(n_iter):
+        new_labels, sq_dists = nearest_centers(x, centers)
+        counts = np.bincount(new_labels, minlength=n_clusters)
+        
+        empty = np.nonzero(counts == 0)[0]
+        if len(empty) > 0:
+            farthest = np.argsort(sq_dists)[::-1][:len(empty)]
+            new_labels[farthest] = empty
+            counts = np.bincount(new_labels, minlength=n_clusters)
+            
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        
+        # Cluster sums via one sort + segmented reduction
+        order = np.argsort(labels, kind='stable')
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        filled = counts > 0
+        sums = np.add.reduceat(x[order], starts[filled], axis=0)
+        centers[filled] = sums / counts[filled, None]
+        
+    return centers, labels
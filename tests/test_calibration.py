@@ -0,0 +1,397 @@
+"""
+Tests for the RLCS Calibration Layer.
+
+Verifies the compiled raw -> Z mapping against the exact quantile/probit map.
+"""
+
+import os
+import pickle
+import tempfile
+import unittest
+import numpy as np
+from scipy.special import ndtr, ndtri
+from resed.calibration.bootstrap import bootstrap_cutoffs, bootstrap_interval, resample_indices
+from resed.calibration.calibrator import RlcsCalibrator
+from resed.calibration.profile import save_profile, load_profile
+from resed.calibration.sketch import KllSketch
+from resed.calibration.state import CalibrationState
+from resed.rlcs.control_surface import rlcs_control_codes
+from resed.rlcs.reference import WhitenedReference, LowRankReference, MixtureReference
+from resed.rlcs.thresholds import TAU_D
+from resed.rlcs.types import SIGNAL_ABSTAIN
+
+class TestRlcsCalibrator(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.reference = rng.gamma(2.0, 1.0, 50000)
+        self.calibrator = RlcsCalibrator()
+        self.calibrator.fit({'population_consistency': self.reference})
+        
+        q, vals = self.calibrator.reference_distributions['population_consistency']
+        self.raw = np.concatenate([rng.gamma(2.0, 1.0, 20000), np.linspace(-1.0, 40.0, 20000)])
+        ranks = np.interp(self.raw, vals, q, left=0.0, right=1.0)
+        self.exact = ndtri(np.clip(ranks, 1e-6, 1.0 - 1e-6))
+        
+    def test_compiled_table_matches_exact_map(self):
+        """Test that the lookup table reproduces the probit map within resolution."""
+        z = self.calibrator.calibrate_batch('population_consistency', self.raw)
+        
+        self.assertLessEqual(np.max(np.abs(z - self.exact)), self.calibrator.resolution)
+        
+    def test_normal_grid_tail_accuracy(self):
+        """Test that a small Z-uniform grid beats a large uniform grid in the tail."""
+        raw_tail = np.quantile(self.reference, ndtr(np.linspace(2.5, 3.5, 50)))
+        rank = np.searchsorted(np.sort(self.reference), raw_tail, side='right') / len(self.reference)
+        z_exact = ndtri(rank)
+        
+        errors = {}
+        for grid, num_quantiles in (('uniform', 1000), ('normal', 128)):
+            calibrator = RlcsCalibrator()
+            calibrator.fit({'population_consistency': self.reference},
+                           num_quantiles=num_quantiles, grid=grid)
+            z = calibrator.calibrate_batch('population_consistency', raw_tail)
+            errors[grid] = np.max(np.abs(z - z_exact))
+            
+        self.assertLess(errors['normal'], 0.05)
+        self.assertLess(errors['normal'], errors['uniform'])
+        
+    def test_scalar_matches_batch(self):
+        """Test that scalar and batch calibration agree."""
+        batch = self.calibrator.calibrate_batch('population_consistency', self.raw[:50])
+        scalar = [self.calibrator.calibrate('population_consistency', r) for r in self.raw[:50]]
+        
+        np.testing.assert_array_equal(batch, scalar)
+        
+    def test_uncalibrated_sensor_passthrough(self):
+        """Test that unknown sensors are returned unchanged."""
+        raw = np.array([0.1, 0.9])
+        np.testing.assert_array_equal(self.calibrator.calibrate_batch('temporal_consistency', raw), raw)
+
+    def test_raw_threshold_inversion(self):
+        """Test that raw > cutoff reproduces calibrated Z > TAU."""
+        z = self.calibrator.calibrate_batch('population_consistency', self.raw)
+        
+        for tau in (-5.0, -1.0, 0.0, 2.0, TAU_D, 10.0):
+            cutoff = self.calibrator.raw_threshold('population_consistency', tau)
+            agree = (self.raw > cutoff) == (z > tau)
+            near_cutoff = np.isclose(self.raw, cutoff, rtol=1e-9, atol=1e-12)
+            self.assertTrue(np.all(agree | near_cutoff))
+            
+        self.assertEqual(self.calibrator.raw_threshold('population_consistency', 10.0), np.inf)
+        self.assertEqual(self.calibrator.raw_threshold('population_consistency', -10.0), -np.inf)
+        self.assertEqual(self.calibrator.raw_threshold('temporal_consistency', 0.5), 0.5)
+        
+    def test_rlcs_control_decision_fast_path(self):
+        """Test that raw-cutoff decisions equal decisions on Z-scores."""
+        rng = np.random.default_rng(1)
+        mu = np.zeros(8)
+        z_ref = rng.normal(0, 1.0, (5000, 8))
+        diag_ref = {}
+        rlcs_control_codes(z_ref, None, diagnostics=diag_ref, mu=mu, stream_ids=np.arange(5000))
+        
+        calibrator = RlcsCalibrator()
+        calibrator.fit({'population_consistency': diag_ref['population_consistency']})
+        
+        z = rng.normal(0, 1.6, (5000, 8))
+        diagnostics = {}
+        codes = rlcs_control_codes(z, None, diagnostics=diagnostics, calibrator=calibrator,
+                                   mu=mu, stream_ids=np.arange(5000))
+        
+        expected = diagnostics['population_consistency_z'] > TAU_D
+        np.testing.assert_array_equal(codes == SIGNAL_ABSTAIN, expected)
+        self.assertTrue(np.any(expected))
+
+class TestStreamingCalibration(unittest.TestCase):
+    
+    def test_sketch_rank_error(self):
+        """Test the documented rank-error bound on a heavy-tailed stream."""
+        rng = np.random.default_rng(2)
+        data = rng.standard_cauchy(400000)
+        sketch = KllSketch(k=1024, seed=0)
+        for start in range(0, len(data), 30000):
+            sketch.update(data[start:start + 30000])
+            
+        q = np.linspace(0, 1, 501)
+        ranks = np.searchsorted(np.sort(data), sketch.quantiles(q)) / len(data)
+        
+        self.assertLess(np.max(np.abs(ranks - q)), 2.0 / 1024)
+        self.assertLess(sketch.size, 3 * 1024)
+        self.assertEqual(len(sketch), len(data))
+        
+    def test_fit_stream_from_memmap_and_generator(self):
+        """Test streamed fitting against in-memory fitting."""
+        rng = np.random.default_rng(3)
+        reference = rng.gamma(2.0, 1.0, 200000)
+        exact = RlcsCalibrator()
+        exact.fit({'population_consistency': reference})
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "scores.npy")
+            np.save(path, reference)
+            scores = np.load(path, mmap_mode='r')
+            
+            streamed = RlcsCalibrator()
+            streamed.fit_stream({
+                'population_consistency': scores,
+                'density_consistency': (reference[i:i + 7000] for i in range(0, len(reference), 7000)),
+            }, chunk_size=10000)
+            del scores
+            
+        raw = np.quantile(reference, np.linspace(0.01, 0.999, 200))
+        for sensor in ('population_consistency', 'density_consistency'):
+            z = streamed.calibrate_batch(sensor, raw)
+            z_exact = exact.calibrate_batch('population_consistency', raw)
+            np.testing.assert_allclose(z, z_exact, atol=0.05)
+
+    def test_merged_state_matches_single_process(self):
+        """Test sharded, pickled and merged states against one stream."""
+        rng = np.random.default_rng(4)
+        reference = rng.gamma(2.0, 1.0, 240000)
+        
+        single = CalibrationState(sketch_k=1024)
+        single.update({'population_consistency': reference})
+        
+        shards = []
+        for i, shard in enumerate(np.array_split(reference, 6)):
+            state = CalibrationState(sketch_k=1024, seed=i)
+            state.update({'population_consistency': shard})
+            shards.append(pickle.loads(pickle.dumps(state)))
+        merged = CalibrationState.merge_all(shards)
+        
+        sketch = merged.sketches['population_consistency']
+        self.assertEqual(len(sketch), len(reference))
+        q = np.linspace(0, 1, 501)
+        ranks = np.searchsorted(np.sort(reference), sketch.quantiles(q)) / len(reference)
+        self.assertLess(np.max(np.abs(ranks - q)), 2.0 / 1024)
+        
+        a = RlcsCalibrator()
+        a.fit_state(single)
+        b = RlcsCalibrator()
+        b.fit_state(merged)
+        raw = np.quantile(reference, np.linspace(0.01, 0.99, 200))
+        np.testing.assert_allclose(
+            a.calibrate_batch('population_consistency', raw),
+            b.calibrate_batch('population_consistency', raw),
+            atol=0.05
+        )
+
+class TestProfileArtifact(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.z_ref = rng.normal(0, 1.0, (3000, 6))
+        self.z = rng.normal(0, 1.5, (500, 6))
+        self.calibrator = RlcsCalibrator()
+        self.calibrator.fit({'population_consistency': rng.gamma(2.0, 1.0, 20000)})
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "profile.bin")
+        
+    def tearDown(self):
+        self.tmp.cleanup()
+        
+    def test_round_trip(self):
+        """Test that every reference type and the calibrator survive save/load."""
+        mixture = MixtureReference.fit(self.z_ref, 4)
+        mixture.build_index(2)
+        references = [
+            WhitenedReference.fit(self.z_ref, mode='scalar'),
+            WhitenedReference.fit(self.z_ref, mode='diagonal'),
+            WhitenedReference.fit(self.z_ref, mode='full'),
+            LowRankReference.fit(self.z_ref, 3),
+            mixture,
+        ]
+        raw = np.linspace(-1.0, 20.0, 300)
+        for reference in references:
+            save_profile(self.path, self.calibrator, reference, meta={'dataset': 'synthetic'})
+            calibrator, loaded, meta = load_profile(self.path)
+            
+            self.assertIsInstance(loaded, type(reference))
+            self.assertEqual(meta, {'dataset': 'synthetic'})
+            np.testing.assert_allclose(loaded.score(self.z), reference.score(self.z), rtol=1e-12)
+            np.testing.assert_array_equal(
+                calibrator.calibrate_batch('population_consistency', raw),
+                self.calibrator.calibrate_batch('population_consistency', raw)
+            )
+            self.assertEqual(calibrator.raw_threshold('population_consistency', TAU_D),
+                             self.calibrator.raw_threshold('population_consistency', TAU_D))
+            del calibrator, loaded
+            
+    def test_memory_mapped_load(self):
+        """Test that mmap loading returns read-only views into the file."""
+        save_profile(self.path, self.calibrator)
+        calibrator, reference, _ = load_profile(self.path, mmap=True)
+        
+        raw_knots, _ = calibrator.tables['population_consistency']
+        self.assertFalse(raw_knots.flags.writeable)
+        self.assertIsNone(reference)
+        del calibrator, raw_knots
+        
+    def test_corruption_detected(self):
+        """Test that checksum and magic failures raise ValueError."""
+        save_profile(self.path, self.calibrator, WhitenedReference.fit(self.z_ref))
+        with open(self.path, "r+b") as f:
+            f.seek(-8, os.SEEK_END)
+            f.write(b"\xff" * 8)
+        with self.assertRaises(ValueError):
+            load_profile(self.path)
+        load_profile(self.path, verify=False)
+        
+        with open(self.path, "wb") as f:
+            f.write(b"not an artifact")
+        with self.assertRaises(ValueError):
+            load_profile(self.path)
+            
+    def test_missing_counts_tolerated(self):
+        """Test that calibrator arrays without sample counts load and update."""
+        arrays = {name: value for name, value in self.calibrator.to_arrays().items() if not name.endswith("/count")}
+        calibrator = RlcsCalibrator.from_arrays(arrays)
+        self.assertNotIn('population_consistency', calibrator.counts)
+        
+        raw = np.linspace(-1.0, 20.0, 300)
+        np.testing.assert_array_equal(calibrator.calibrate_batch('population_consistency', raw),
+                                      self.calibrator.calibrate_batch('population_consistency', raw))
+        calibrator.update({'population_consistency': np.random.default_rng(6).gamma(2.0, 1.0, 5000)})
+        self.assertEqual(calibrator.counts['population_consistency'], 10000.0)
+
+class TestIncrementalCalibration(unittest.TestCase):
+    
+    def setUp(self):
+        self.rng = np.random.default_rng(6)
+        self.raw = np.linspace(0.5, 12.0, 200)
+        
+    def test_cumulative_update_matches_refit(self):
+        """Test that chunked updates reproduce a fit on all the data."""
+        data = self.rng.gamma(2.0, 1.0, 100000)
+        chunks = np.array_split(data, 10)
+        
+        incremental = RlcsCalibrator()
+        incremental.fit({'population_consistency': chunks[0]})
+        for chunk in chunks[1:]:
+            incremental.update({'population_consistency': chunk})
+        full = RlcsCalibrator()
+        full.fit({'population_consistency': data})
+        raw = np.quantile(data, ndtr(np.linspace(-3.0, 3.0, 200)))
+        
+        self.assertEqual(incremental.counts['population_consistency'], len(data))
+        np.testing.assert_allclose(
+            incremental.calibrate_batch('population_consistency', raw),
+            full.calibrate_batch('population_consistency', raw),
+            atol=0.05
+        )
+        
+    def test_forgetting_and_window_track_drift(self):
+        """Test that forgetting and sliding-window modes follow a shifted reference."""
+        old = self.rng.gamma(2.0, 1.0, 50000)
+        new = [self.rng.gamma(2.0, 1.0, 5000) + 3.0 for _ in range(30)]
+        target = RlcsCalibrator()
+        target.fit({'population_consistency': np.concatenate(new[-4:])})
+        
+        for calibrator in (RlcsCalibrator(forgetting=0.5), RlcsCalibrator(window=4), RlcsCalibrator()):
+            calibrator.fit({'population_consistency': old})
+            for chunk in new:
+                calibrator.update({'population_consistency': chunk})
+            error = np.max(np.abs(
+                calibrator.calibrate_batch('population_consistency', self.raw)
+                - target.calibrate_batch('population_consistency', self.raw)
+            ))
+            if calibrator.forgetting is None and calibrator.window is None:
+                self.assertGreater(error, 0.2)
+            else:
+                self.assertLess(error, 0.15)
+                
+        windowed = RlcsCalibrator(window=4)
+        windowed.fit({'population_consistency': old})
+        for chunk in new:
+            windowed.update({'population_consistency': chunk})
+        self.assertEqual(len(windowed._history['population_consistency']), 4)
+        
+    def test_update_invalidates_cutoffs(self):
+        """Test that cached raw cutoffs follow the updated table."""
+        calibrator = RlcsCalibrator()
+        calibrator.fit({'population_consistency': self.rng.gamma(2.0, 1.0, 20000)})
+        before = calibrator.raw_threshold('population_consistency', TAU_D)
+        calibrator.update({'population_consistency': self.rng.gamma(2.0, 1.0, 20000) * 3.0})
+        
+        self.assertGreater(calibrator.raw_threshold('population_consistency', TAU_D), before)
+        
+    def test_invalid_modes(self):
+        """Test that conflicting or out-of-range modes raise ValueError."""
+        with self.assertRaises(ValueError):
+            RlcsCalibrator(forgetting=0.9, window=3)
+        with self.assertRaises(ValueError):
+            RlcsCalibrator(forgetting=1.5)
+
+class TestStackedCalibration(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.names = ['population_consistency', 'temporal_consistency',
+                      'agreement_consistency', 'density_consistency']
+        self.calibrator = RlcsCalibrator()
+        self.calibrator.fit({
+            'population_consistency': rng.gamma(2.0, 1.0, 20000),
+            'temporal_consistency': rng.beta(8.0, 2.0, 20000),
+            'density_consistency': rng.lognormal(0.0, 0.5, 20000),
+        })
+        self.scores = np.column_stack([
+            np.linspace(-1.0, 30.0, 1000),
+            np.linspace(-0.1, 1.1, 1000),
+            np.linspace(0.0, 1.0, 1000),
+            np.linspace(0.0, 10.0, 1000),
+        ])
+        
+    def test_stack_matches_per_sensor(self):
+        """Test that one stacked call equals per-sensor calibration."""
+        z = self.calibrator.calibrate_stack(self.scores, self.names)
+        
+        for j, name in enumerate(self.names):
+            np.testing.assert_allclose(
+                z[:, j], self.calibrator.calibrate_batch(name, self.scores[:, j]), atol=1e-9
+            )
+        np.testing.assert_array_equal(z[:, 2], self.scores[:, 2])
+        
+    def test_rlcs_control_reports_all_calibrated_sensors(self):
+        """Test that diagnostics carry Z-scores for every fitted sensor."""
+        rng = np.random.default_rng(8)
+        z = rng.normal(0, 1.0, (200, 4))
+        diagnostics = {}
+        rlcs_control_codes(z, None, diagnostics=diagnostics, calibrator=self.calibrator,
+                           mu=np.zeros(4), stream_ids=np.arange(200) % 7)
+        
+        for name in ('population_consistency', 'temporal_consistency'):
+            np.testing.assert_allclose(
+                diagnostics[f"{name}_z"],
+                self.calibrator.calibrate_batch(name, diagnostics[name]),
+                atol=1e-9
+            )
+        self.assertNotIn('agreement_consistency_z', diagnostics)
+
+class TestBootstrap(unittest.TestCase):
+    
+    def setUp(self):
+        self.scores = np.random.default_rng(9).gamma(2.0, 1.0, 20000)
+        
+    def test_matches_looped_refit(self):
+        """Test that vectorized resamples equal refitting a calibrator per resample."""
+        cutoffs = bootstrap_cutoffs(self.scores, n_boot=12, seed=3, block_size=5)
+        
+        sorted_scores = np.sort(self.scores)
+        for b in range(12):
+            calibrator = RlcsCalibrator()
+            calibrator.fit({'population_consistency': sorted_scores[resample_indices(len(self.scores), 3, b)]})
+            self.assertAlmostEqual(cutoffs[b], calibrator.raw_threshold('population_consistency', TAU_D), places=9)
+            
+    def test_deterministic_across_blocks_and_processes(self):
+        """Test that results depend only on the seed."""
+        serial = bootstrap_cutoffs(self.scores, n_boot=16, seed=1)
+        parallel = bootstrap_cutoffs(self.scores, n_boot=16, seed=1, block_size=3, n_jobs=2)
+        
+        np.testing.assert_array_equal(serial, parallel)
+        
+        low, high, cutoffs = bootstrap_interval(self.scores, n_boot=100, seed=1)
+        self.assertLess(low, high)
+        self.assertTrue(low <= np.quantile(self.scores, 0.99865) <= high)
+
+if __name__ == '__main__':
+    unittest.main()
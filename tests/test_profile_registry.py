@@ -0,0 +1,109 @@
+"""
+Tests for the Profile Registry.
+
+Verifies lazy loading, LRU eviction, and per-tenant dispatch against
+direct per-tenant evaluation.
+"""
+
+import os
+import tempfile
+import unittest
+import numpy as np
+from resed.calibration.calibrator import RlcsCalibrator
+from resed.calibration.profile import save_profile
+from resed.calibration.registry import ProfileRegistry
+from resed.rlcs.control_surface import rlcs_control_codes
+from resed.rlcs.reference import WhitenedReference
+from resed.rlcs.sensors.temporal import TemporalSensor, stream_temporal_consistency
+
+class TestProfileRegistry(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.profiles = {}
+        for i, tenant in enumerate(['alpha', 'beta', 'gamma']):
+            z_ref = rng.normal(i, 1.0 + i, (2000, 6))
+            reference = WhitenedReference.fit(z_ref, mode='diagonal')
+            calibrator = RlcsCalibrator()
+            calibrator.fit({'population_consistency': reference.score(z_ref)})
+            save_profile(os.path.join(self.tmp.name, f"{tenant}.bin"), calibrator, reference)
+            self.profiles[tenant] = (calibrator, reference)
+            
+        self.tenant_ids = rng.choice(['alpha', 'beta', 'gamma'], size=600)
+        self.z = rng.normal(1.0, 2.5, (600, 6))
+        
+    def tearDown(self):
+        self.tmp.cleanup()
+        
+    def test_dispatch_matches_per_tenant_calls(self):
+        """Test that grouped dispatch equals evaluating each tenant separately."""
+        registry = ProfileRegistry(root=self.tmp.name)
+        diagnostics = {}
+        codes = registry.dispatch(self.z, self.tenant_ids, diagnostics=diagnostics)
+        
+        for tenant, (calibrator, reference) in self.profiles.items():
+            rows = np.flatnonzero(self.tenant_ids == tenant)
+            expected_diag = {}
+            expected = rlcs_control_codes(self.z[rows], None, diagnostics=expected_diag,
+                                          calibrator=calibrator, reference=reference)
+            np.testing.assert_array_equal(codes[rows], expected)
+            np.testing.assert_allclose(diagnostics['population_consistency_z'][rows],
+                                       expected_diag['population_consistency_z'])
+        self.assertEqual(len(registry), 3)
+        
+    def test_dispatch_temporal_sensor_across_batches(self):
+        """Test that a temporal sensor carries its state across dispatched batches."""
+        registry = ProfileRegistry(root=self.tmp.name)
+        sensor = TemporalSensor()
+        diagnostics = [{}, {}]
+        registry.dispatch(self.z[:300], self.tenant_ids[:300], diagnostics=diagnostics[0], temporal_sensor=sensor)
+        registry.dispatch(self.z[300:], self.tenant_ids[300:], diagnostics=diagnostics[1], temporal_sensor=sensor)
+        
+        streams = np.unique(self.tenant_ids, return_inverse=True)[1]
+        expected = stream_temporal_consistency(self.z, streams)
+        t_scores = np.concatenate([d['temporal_consistency'] for d in diagnostics])
+        np.testing.assert_allclose(t_scores, expected)
+        self.assertLess(t_scores[300], 1.0)
+        
+    def test_dispatch_temporal_sensor_interleaved_tenants(self):
+        """Test that a temporal sensor never compares rows of different tenants."""
+        tenant_ids = np.tile(['alpha', 'beta'], 50)
+        z = np.where(tenant_ids[:, None] == 'alpha', 0.0, 5.0) + np.zeros((100, 6))
+        
+        for kwargs in ({'temporal_sensor': TemporalSensor()}, {}):
+            diagnostics = {}
+            ProfileRegistry(root=self.tmp.name).dispatch(z, tenant_ids, diagnostics=diagnostics, **kwargs)
+            np.testing.assert_allclose(diagnostics['temporal_consistency'], 1.0)
+        
+    def test_lru_eviction(self):
+        """Test count- and size-bounded eviction order."""
+        registry = ProfileRegistry(root=self.tmp.name, max_profiles=2)
+        registry.get('alpha')
+        registry.get('beta')
+        registry.get('alpha')
+        registry.get('gamma')
+        
+        self.assertIn('alpha', registry)
+        self.assertNotIn('beta', registry)
+        self.assertIn('gamma', registry)
+        
+        size = registry.get('alpha').nbytes
+        registry = ProfileRegistry(root=self.tmp.name, max_bytes=size)
+        registry.get('alpha')
+        registry.get('beta')
+        self.assertEqual(len(registry), 1)
+        self.assertLessEqual(registry.nbytes, size)
+        
+    def test_registered_paths_and_missing_tenant(self):
+        """Test explicit registration and unknown tenants."""
+        registry = ProfileRegistry()
+        registry.register(7, os.path.join(self.tmp.name, "beta.bin"))
+        
+        profile = registry.get(7)
+        np.testing.assert_array_equal(profile.reference.mu, self.profiles['beta'][1].mu)
+        with self.assertRaises(KeyError):
+            registry.get('delta')
+
+if __name__ == '__main__':
+    unittest.main()
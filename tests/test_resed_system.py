@@ -5,6 +5,28 @@ Unit tests for the overall ResED system.
 
 """
 
+import numpy as np
+from resed.system.resed_block import ResEdBlock
+
 def test_system_placeholder():
     """Placeholder test."""
     pass
+
+def test_forward_stream_ids():
+    """Test that interleaved streams carry temporal state across forward calls."""
+    block = ResEdBlock(d_in=4, d_z=4, d_out=2, n_heads=2, stream_capacity=16)
+    block.encoder.set_weights(np.eye(4), np.zeros(4))
+    
+    x = np.zeros((2, 4))
+    x[1, 0] = 2.0
+    block.forward(x, stream_ids=np.array([7, 8]))
+    
+    # Both streams jump relative to their own previous latent
+    _, diagnostics = block.forward(x[::-1].copy(), stream_ids=np.array([7, 8]))
+    t_scores = diagnostics['temporal_consistency']
+    
+    assert t_scores[0] < 0.5
+    assert t_scores[1] < 0.5
+    
+    _, diagnostics = block.forward(x[::-1].copy(), stream_ids=np.array([7, 8]))
+    np.testing.assert_allclose(diagnostics['temporal_consistency'], [1.0, 1.0])
@@ -4,8 +4,12 @@ Tests for resENC (Reference Encoder).
 Verifies determinism, shape correctness, and statistical channel output.
 """
 
+import os
+import tempfile
+import tracemalloc
 import unittest
 import numpy as np
+from scipy import sparse
 from resed.encoders.resenc import ResENC
 
 class TestResENC(unittest.TestCase):
@@ -64,6 +68,147 @@ class TestResENC(unittest.TestCase):
         expected_entropy = -np.sum(probs * np.log(probs + 1e-12))
         self.assertAlmostEqual(s[0, 2], expected_entropy)
 
+    def test_batched_statistics_match_per_row(self):
+        """Test batched statistics against a per-row computation."""
+        rng = np.random.default_rng(0)
+        encoder = ResENC(self.d_in, 16)
+        encoder.set_weights(rng.normal(size=(self.d_in, 16)), rng.normal(size=16))
+        z, s = encoder.encode(rng.normal(size=(50, self.d_in)) * 3.0)
+        
+        for i, zi in enumerate(z):
+            exps = np.exp(zi - np.max(zi))
+            probs = exps / np.sum(exps)
+            expected = [
+                np.linalg.norm(zi),
+                np.var(zi),
+                -np.sum(probs * np.log(probs + 1e-12)),
+                np.sum(np.abs(zi)) / np.sqrt(16),
+            ]
+            np.testing.assert_allclose(s[i], expected, rtol=1e-12, atol=1e-15)
+
+    def test_encode_into_matches_encode(self):
+        """Test caller-provided and pooled buffers against encode."""
+        rng = np.random.default_rng(1)
+        encoder = ResENC(self.d_in, 16)
+        encoder.set_weights(rng.normal(size=(self.d_in, 16)), rng.normal(size=16))
+        x = rng.normal(size=(40, self.d_in))
+        z_ref, s_ref = encoder.encode(x)
+        
+        out = np.empty((40, 16))
+        stats_out = np.empty((40, 4))
+        z, s = encoder.encode_into(x, out=out, stats_out=stats_out)
+        self.assertIs(z, out)
+        self.assertIs(s, stats_out)
+        np.testing.assert_array_equal(z, z_ref)
+        np.testing.assert_array_equal(s, s_ref)
+        
+        z_pool, s_pool = encoder.encode_into(x)
+        np.testing.assert_array_equal(z_pool, z_ref)
+        np.testing.assert_array_equal(s_pool, s_ref)
+        z_small, _ = encoder.encode_into(x[:10])
+        self.assertTrue(np.shares_memory(z_small, z_pool))
+        
+        with self.assertRaises(ValueError):
+            encoder.encode_into(x, out=np.empty((40, 15)))
+            
+    def test_encode_into_steady_state_allocations(self):
+        """Test that warm encode_into calls allocate nothing of batch size."""
+        rng = np.random.default_rng(2)
+        encoder = ResENC(self.d_in, 32)
+        encoder.set_weights(rng.normal(size=(self.d_in, 32)), rng.normal(size=32))
+        x = rng.normal(size=(20000, self.d_in))
+        encoder.encode_into(x)
+        
+        tracemalloc.start()
+        encoder.encode_into(x)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        # One (batch,) float64 row is 160 KB; NumPy's fixed ufunc buffer is 64 KB
+        self.assertLess(peak, 150_000)
+
+    def test_lazy_statistics(self):
+        """Test that lazy statistics are deferred, cached and match eager ones."""
+        rng = np.random.default_rng(3)
+        encoder = ResENC(self.d_in, 8)
+        encoder.set_weights(rng.normal(size=(self.d_in, 8)), rng.normal(size=8))
+        x = rng.normal(size=(30, self.d_in))
+        _, s_eager = encoder.encode(x)
+        z, s = encoder.encode(x, lazy=True)
+        
+        self.assertEqual(s.shape, (30, 4))
+        self.assertEqual(s._cache, {})
+        np.testing.assert_array_equal(s[:, 2], s_eager[:, 2])
+        self.assertEqual(set(s._cache), {'entropy'})
+        self.assertIs(s.get('entropy'), s.get('entropy'))
+        np.testing.assert_array_equal(s.compute(['sparsity', 'norm']), s_eager[:, [3, 0]])
+        np.testing.assert_array_equal(np.asarray(s), s_eager)
+        
+        with self.assertRaises(ValueError):
+            s.get('kurtosis')
+
+    def test_encode_iter_sources_and_sinks(self):
+        """Test streamed encoding from memmaps and generators into sinks."""
+        rng = np.random.default_rng(4)
+        encoder = ResENC(self.d_in, 6)
+        encoder.set_weights(rng.normal(size=(self.d_in, 6)), rng.normal(size=6))
+        x = rng.normal(size=(1000, self.d_in))
+        z_ref, s_ref = encoder.encode(x)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "x.npy")
+            np.save(path, x)
+            
+            chunks = list(encoder.encode_iter(path, chunk_size=300))
+            self.assertEqual([z.shape[0] for z, _ in chunks], [300, 300, 300, 100])
+            np.testing.assert_allclose(np.concatenate([z for z, _ in chunks]), z_ref)
+            np.testing.assert_allclose(np.concatenate([s for _, s in chunks]), s_ref)
+            
+            z_path = os.path.join(tmp, "z.npy")
+            for _ in encoder.encode_iter(path, chunk_size=256, sink=z_path):
+                pass
+            np.testing.assert_allclose(np.load(z_path), z_ref)
+            
+            z_sink = np.empty((1000, 6))
+            s_sink = np.empty((1000, 4))
+            generator = (x[i:i + 170] for i in range(0, 1000, 170))
+            for _ in encoder.encode_iter(generator, sink=z_sink, stats_sink=s_sink):
+                pass
+            np.testing.assert_allclose(z_sink, z_ref)
+            np.testing.assert_allclose(s_sink, s_ref)
+            
+            with self.assertRaises(ValueError):
+                next(encoder.encode_iter(iter([x]), sink=z_path))
+            with self.assertRaises(ValueError):
+                for _ in encoder.encode_iter(iter([x[:600]]), sink=z_sink):
+                    pass
+                    
+            # Only a stats sink: Z is not a pooled buffer reused by the next chunk
+            chunks = list(encoder.encode_iter(path, chunk_size=300, stats_sink=s_sink))
+            np.testing.assert_allclose(np.concatenate([z for z, _ in chunks]), z_ref)
+
+    def test_sparse_input(self):
+        """Test CSR/CSC/COO inputs against the dense path."""
+        rng = np.random.default_rng(5)
+        encoder = ResENC(200, 12)
+        encoder.set_weights(rng.normal(size=(200, 12)), rng.normal(size=12))
+        x = sparse.random(300, 200, density=0.02, format='csr', random_state=0)
+        z_ref, s_ref = encoder.encode(x.toarray())
+        
+        for fmt in ('csr', 'csc', 'coo'):
+            z, s = encoder.encode(x.asformat(fmt))
+            np.testing.assert_allclose(z, z_ref, atol=1e-12)
+            np.testing.assert_allclose(s, s_ref, atol=1e-12)
+            
+        z, _ = encoder.encode_into(x)
+        np.testing.assert_allclose(z, z_ref, atol=1e-12)
+        for fmt in ('csr', 'csc', 'coo'):
+            streamed = np.concatenate([z for z, _ in encoder.encode_iter(x.asformat(fmt), chunk_size=64)])
+            np.testing.assert_allclose(streamed, z_ref, atol=1e-12)
+        
+        with self.assertRaises(ValueError):
+            encoder.encode(sparse.random(3, 199, density=0.1, format='csr'))
+
     def test_input_validation(self):
         """Test error handling for bad inputs."""
         with self.assertRaises(ValueError):
@@ -4,10 +4,15 @@ Tests for RLCS Control Surface.
 Verifies the signal escalation logic and integration of sensors.
 """
 
+import os
+import tempfile
 import unittest
 import numpy as np
-from resed.rlcs.control_surface import rlcs_control
-from resed.rlcs.types import RlcsSignal
+from resed.rlcs.control_surface import rlcs_control, rlcs_control_codes, rlcs_decide
+from resed.rlcs.types import RlcsSignal, signals_from_codes, codes_from_signals
+from resed.rlcs.chunked import rlcs_control_chunked
+from resed.rlcs.control import ControlSurface
+from resed.rlcs.sensors.temporal import TemporalSensor
 from resed.rlcs.thresholds import TAU_D, TAU_T, TAU_A
 
 class TestRlcsControl(unittest.TestCase):
@@ -75,5 +80,130 @@ class TestRlcsControl(unittest.TestCase):
         
         self.assertEqual(signals[0], RlcsSignal.ABSTAIN)
 
+    def test_codes_match_signals(self):
+        """Test that the vectorized code path matches the signal list."""
+        rng = np.random.default_rng(0)
+        z = rng.normal(0, 1.0, (500, 4))
+        z_prime = z + rng.normal(0, 1.0, z.shape)
+        s = np.zeros((500, 4))
+        
+        codes = rlcs_control_codes(z, s, z_prime=z_prime)
+        signals = rlcs_control(z, s, z_prime=z_prime)
+        
+        self.assertEqual(codes.dtype, np.uint8)
+        self.assertEqual(signals_from_codes(codes), signals)
+        np.testing.assert_array_equal(codes_from_signals(signals), codes)
+        
+    def test_decide_priority_order(self):
+        """Test priority masks against a per-sample reference loop."""
+        rng = np.random.default_rng(1)
+        d = rng.uniform(0, 6, 1000)
+        t = rng.uniform(0, 1, 1000)
+        a = rng.uniform(0, 1, 1000)
+        
+        expected = []
+        for i in range(1000):
+            if d[i] > TAU_D:
+                expected.append(RlcsSignal.ABSTAIN)
+            elif t[i] < TAU_T:
+                expected.append(RlcsSignal.DEFER)
+            elif a[i] < TAU_A:
+                expected.append(RlcsSignal.DOWNWEIGHT)
+            else:
+                expected.append(RlcsSignal.PROCEED)
+                
+        self.assertEqual(signals_from_codes(rlcs_decide(d, t, a)), expected)
+
+    def test_fused_path_matches_default(self):
+        """Test that the fused sensor path yields identical decisions."""
+        rng = np.random.default_rng(2)
+        z = rng.normal(0, 1.0, (300, 8))
+        z_prime = z + rng.normal(0, 0.5, z.shape)
+        s = np.zeros((300, 4))
+        
+        diag_ref, diag_fused = {}, {}
+        codes = rlcs_control_codes(z, s, diagnostics=diag_ref, z_prime=z_prime, sigma=1.5)
+        codes_fused = rlcs_control_codes(z, s, diagnostics=diag_fused, z_prime=z_prime, sigma=1.5, fused=True)
+        
+        np.testing.assert_array_equal(codes, codes_fused)
+        for key in diag_ref:
+            np.testing.assert_allclose(diag_fused[key], diag_ref[key], rtol=1e-9)
+
+    def test_temporal_sensor_across_calls(self):
+        """Test that drift at a chunk boundary is not hidden."""
+        s = np.zeros((1, 4))
+        sensor = TemporalSensor()
+        
+        first = rlcs_control(np.zeros((1, 5)), s, temporal_sensor=sensor)
+        z1 = np.zeros((1, 5))
+        z1[0, 0] = 1.0
+        second = rlcs_control(z1, s, temporal_sensor=sensor)
+        
+        self.assertEqual(first[0], RlcsSignal.PROCEED)
+        self.assertEqual(second[0], RlcsSignal.DEFER)
+        
+        # Fused path carries the same state
+        third = rlcs_control(np.zeros((1, 5)), s, temporal_sensor=sensor, fused=True)
+        self.assertEqual(third[0], RlcsSignal.DEFER)
+
+    def test_chunked_memmap_matches_single_batch(self):
+        """Test that the out-of-core driver reproduces a single in-memory call."""
+        rng = np.random.default_rng(6)
+        z = rng.normal(0, 0.4, (1000, 6))
+        z_prime = z + rng.normal(0, 0.3, z.shape)
+        
+        diag_ref = {}
+        codes_ref = rlcs_control_codes(z, None, diagnostics=diag_ref, z_prime=z_prime, sigma=0.5)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            z_path = os.path.join(tmp, "z.npy")
+            np.save(z_path, z)
+            outputs = rlcs_control_chunked(z_path, os.path.join(tmp, "out"), chunk_size=97,
+                                           z_prime=z_prime, sigma=0.5)
+            
+            np.testing.assert_array_equal(outputs['signals'], codes_ref)
+            for key, scores in diag_ref.items():
+                np.testing.assert_array_equal(outputs[key], scores)
+                
+            reloaded = np.load(os.path.join(tmp, "out", "signals.npy"), mmap_mode='r')
+            np.testing.assert_array_equal(reloaded, codes_ref)
+            del outputs, reloaded
+
+    def test_control_surface_deterministic_across_threads(self):
+        """Test that the block-parallel engine is independent of thread count."""
+        rng = np.random.default_rng(7)
+        z = rng.normal(0, 0.4, (5000, 8))
+        z_prime = z + rng.normal(0, 0.3, z.shape)
+        
+        diag_ref = {}
+        codes_ref = rlcs_control_codes(z, None, diagnostics=diag_ref, z_prime=z_prime, sigma=0.5)
+        
+        for n_threads in (1, 3, 8):
+            diagnostics = {}
+            with ControlSurface(n_threads=n_threads, block_size=333, sigma=0.5) as surface:
+                codes = surface.evaluate(z, diagnostics=diagnostics, z_prime=z_prime)
+            np.testing.assert_array_equal(codes, codes_ref)
+            for key, scores in diag_ref.items():
+                np.testing.assert_array_equal(diagnostics[key], scores)
+                
+    def test_control_surface_stateful_temporal(self):
+        """Test temporal state and stream ids through the parallel engine."""
+        rng = np.random.default_rng(8)
+        z = rng.normal(0, 0.4, (600, 4))
+        stream_ids = rng.integers(0, 5, 600)
+        
+        codes_ref = rlcs_control_codes(z, None, stream_ids=stream_ids)
+        surface = ControlSurface(n_threads=4, block_size=64)
+        np.testing.assert_array_equal(surface.evaluate(z, stream_ids=stream_ids), codes_ref)
+        
+        sensor = TemporalSensor()
+        codes_ref = rlcs_control_codes(z, None)
+        codes = np.concatenate([
+            surface.evaluate(z[:250], temporal_sensor=sensor),
+            surface.evaluate(z[250:], temporal_sensor=sensor),
+        ])
+        surface.close()
+        np.testing.assert_array_equal(codes, codes_ref)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
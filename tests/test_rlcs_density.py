@@ -0,0 +1,74 @@
+"""
+Tests for the k-NN Density Sensor.
+
+Verifies the IVF index against brute-force search, persistence, and
+integration with the control surface.
+"""
+
+import os
+import tempfile
+import unittest
+import numpy as np
+from resed.rlcs.index import IVFIndex
+from resed.rlcs.sensors.density import KnnDensitySensor
+from resed.rlcs.control_surface import rlcs_control_codes
+from resed.rlcs.types import SIGNAL_ABSTAIN
+
+class TestKnnDensity(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Non-Gaussian manifold: noisy ring in 2D, embedded in 6D
+        theta = rng.uniform(0, 2 * np.pi, 4000)
+        ring = np.stack([np.cos(theta), np.sin(theta)], axis=1) * 5.0
+        self.reference = np.hstack([ring, np.zeros((4000, 4))]) + rng.normal(0, 0.1, (4000, 6))
+        self.queries = self.reference[:200] + rng.normal(0, 0.05, (200, 6))
+        
+    def test_exhaustive_probe_matches_brute_force(self):
+        """Test that probing every list returns the exact neighbours."""
+        index = IVFIndex.build(self.reference, n_lists=16)
+        dists, ids = index.search(self.queries, k=5, n_probe=16)
+        
+        full = np.linalg.norm(self.queries[:, None, :] - self.reference[None, :, :], axis=2)
+        expected = np.sort(full, axis=1)[:, :5]
+        
+        np.testing.assert_allclose(dists, expected, atol=1e-6)
+        np.testing.assert_allclose(np.take_along_axis(full, ids, axis=1), expected, atol=1e-6)
+        
+    def test_approximate_recall(self):
+        """Test that a few probes find the true k-th neighbour distance."""
+        index = IVFIndex.build(self.reference, n_lists=64)
+        approx, _ = index.search(self.queries, k=5, n_probe=8)
+        exact, _ = index.search(self.queries, k=5, n_probe=64)
+        
+        self.assertGreater(np.mean(np.isclose(approx[:, -1], exact[:, -1])), 0.9)
+        
+    def test_centre_of_ring_abstains(self):
+        """Test that the empty centre of the ring is flagged, unlike the mean distance."""
+        sensor = KnnDensitySensor.fit(self.reference, k=10, n_lists=32)
+        z = np.vstack([self.queries[:50], np.zeros((5, 6))])
+        
+        diagnostics = {}
+        codes = rlcs_control_codes(z, None, diagnostics=diagnostics, density_sensor=sensor,
+                                   mu=np.mean(self.reference, axis=0), sigma=5.0,
+                                   stream_ids=np.arange(55))
+        
+        self.assertLess(np.mean(diagnostics['density_consistency'][:50]), 2.0)
+        self.assertTrue(np.all(codes[50:] == SIGNAL_ABSTAIN))
+        self.assertLess(np.mean(codes[:50] == SIGNAL_ABSTAIN), 0.1)
+        
+    def test_save_load_roundtrip(self):
+        """Test sensor persistence."""
+        sensor = KnnDensitySensor.fit(self.reference, k=5, n_lists=16)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("density.npz", "density"):
+                path = os.path.join(tmp, name)
+                sensor.save(path)
+                loaded = KnnDensitySensor.load(path)
+                
+                self.assertEqual(loaded.k, 5)
+                np.testing.assert_array_equal(loaded.measure(self.queries), sensor.measure(self.queries))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Tests for RLCS Reference Populations.
+
+Verifies the cached whitening transforms against explicit formulas.
+"""
+
+import unittest
+from unittest import mock
+import numpy as np
+from resed.rlcs.reference import WhitenedReference, LowRankReference, MixtureReference
+from resed.rlcs.sensors import population_consistency
+from resed.rlcs.control_surface import rlcs_control_codes
+from resed.rlcs.types import SIGNAL_ABSTAIN
+from resed.utils.math import squared_distances
+
+class TestWhitenedReference(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        mixing = rng.normal(0, 1.0, (6, 6))
+        self.z_ref = rng.normal(0, 1.0, (2000, 6)) @ mixing + 2.0
+        self.z = rng.normal(0, 1.0, (50, 6)) @ mixing + 2.0
+        
+    def test_scalar_matches_population_consistency(self):
+        """Test that scalar mode reproduces the raw sensor."""
+        mu = np.mean(self.z_ref, axis=0)
+        ref = WhitenedReference(mu, sigma=1.7)
+        
+        np.testing.assert_allclose(ref.score(self.z), population_consistency(self.z, mu, 1.7))
+        
+    def test_diagonal_scaling(self):
+        """Test per-dimension scaling."""
+        ref = WhitenedReference.fit(self.z_ref, mode='diagonal')
+        expected = np.linalg.norm((self.z - ref.mu) / (ref.sigma + 1e-8), axis=1)
+        
+        np.testing.assert_allclose(ref.score(self.z), expected)
+        
+    def test_full_matches_mahalanobis(self):
+        """Test that the Cholesky solve equals the explicit inverse."""
+        ref = WhitenedReference.fit(self.z_ref, mode='full', ridge=1e-6)
+        cov = np.cov(self.z_ref, rowvar=False) + 1e-6 * np.eye(6)
+        diff = self.z - ref.mu
+        expected = np.sqrt(np.sum((diff @ np.linalg.inv(cov)) * diff, axis=1))
+        
+        np.testing.assert_allclose(ref.score(self.z), expected, rtol=1e-8)
+        
+    def test_rlcs_control_reference(self):
+        """Test that rlcs_control uses the reference for Population Consistency."""
+        ref = WhitenedReference.fit(self.z_ref, mode='full')
+        diagnostics = {}
+        rlcs_control_codes(self.z, None, diagnostics=diagnostics, reference=ref)
+        
+        np.testing.assert_array_equal(diagnostics['population_consistency'], ref.score(self.z))
+        
+    def test_shape_validation(self):
+        """Test error handling for mismatched shapes."""
+        with self.assertRaises(ValueError):
+            WhitenedReference(np.zeros(3), sigma=np.ones(4))
+        with self.assertRaises(ValueError):
+            WhitenedReference(np.zeros(3), cov=np.eye(2))
+
+class TestLowRankReference(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        d_z, k = 40, 3
+        basis = np.linalg.qr(rng.normal(0, 1.0, (d_z, k)))[0].T
+        self.z_ref = (rng.normal(0, 1.0, (5000, k)) * [5.0, 3.0, 2.0]) @ basis
+        self.z_ref += rng.normal(0, 0.1, self.z_ref.shape) + 1.0
+        self.z = rng.normal(0, 1.0, (100, d_z)) + 1.0
+        
+    def test_matches_model_covariance(self):
+        """Test that scores equal Mahalanobis under the low-rank covariance."""
+        ref = LowRankReference.fit(self.z_ref, n_components=3)
+        d_z = self.z_ref.shape[1]
+        
+        V = ref.components
+        cov = V.T @ np.diag(ref.variances) @ V + ref.residual_variance * (np.eye(d_z) - V.T @ V)
+        diff = self.z - ref.mu
+        expected = np.sqrt(np.sum((diff @ np.linalg.inv(cov)) * diff, axis=1))
+        
+        np.testing.assert_allclose(ref.score(self.z), expected, rtol=1e-6)
+        
+    def test_streamed_fit_matches_batch_fit(self):
+        """Test that fitting from chunks recovers the in-memory fit."""
+        batch = LowRankReference.fit(self.z_ref, n_components=3)
+        streamed = LowRankReference.fit_stream(
+            (self.z_ref[i:i + 256] for i in range(0, len(self.z_ref), 256)), n_components=3
+        )
+        
+        self.assertEqual(streamed.n_samples, len(self.z_ref))
+        np.testing.assert_allclose(streamed.mu, batch.mu, atol=1e-10)
+        np.testing.assert_allclose(streamed.variances, batch.variances, rtol=1e-3)
+        np.testing.assert_allclose(streamed.residual_variance, batch.residual_variance, rtol=1e-2)
+        np.testing.assert_allclose(streamed.score(self.z), batch.score(self.z), rtol=1e-2)
+        
+    def test_empty_stream(self):
+        """Test error handling for an empty reference stream."""
+        with self.assertRaises(ValueError):
+            LowRankReference.fit_stream([], n_components=2)
+
+class TestMixtureReference(unittest.TestCase):
+    
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.centers = rng.normal(0, 10.0, (64, 8))
+        labels = rng.integers(0, 64, 6000)
+        self.z_ref = self.centers[labels] + rng.normal(0, 0.5, (6000, 8))
+        self.labels = labels
+        self.z = self.centers[rng.integers(0, 64, 300)] + rng.normal(0, 0.5, (300, 8))
+        
+    def test_matches_brute_force(self):
+        """Test that the exact search equals the minimum over all modes."""
+        ref = MixtureReference.from_labels(self.z_ref, self.labels)
+        expected = np.min(np.stack([
+            population_consistency(self.z, ref.mus[k], ref.sigmas[k]) for k in range(ref.n_modes)
+        ]), axis=0)
+        
+        np.testing.assert_allclose(ref.score(self.z), expected, rtol=1e-10)
+        
+    def test_coarse_index(self):
+        """Test the coarse-to-fine search against the exact search."""
+        ref = MixtureReference.from_labels(self.z_ref, self.labels)
+        exact = ref.score(self.z)
+        
+        ref.build_index(n_cells=8, n_probe=2)
+        np.testing.assert_allclose(ref.score(self.z, n_probe=8), exact)
+        
+        # Well-separated modes: probing a few cells finds the same mode
+        agree = np.mean(np.isclose(ref.score(self.z), exact))
+        self.assertGreater(agree, 0.95)
+        
+    def test_coarse_index_scans_fewer_modes(self):
+        """Test that probing 2 of 8 cells evaluates far fewer distances than the exact search."""
+        ref = MixtureReference.from_labels(self.z_ref, self.labels)
+        ref.build_index(n_cells=8, n_probe=2)
+        
+        with mock.patch('resed.rlcs.reference.squared_distances', wraps=squared_distances) as counted:
+            ref.nearest_modes(self.z)
+        scanned = sum(call.args[0].shape[0] * call.args[1].shape[0] for call in counted.call_args_list)
+        
+        # Coarse centers plus the probed cells' modes, against every mode per latent
+        self.assertLess(scanned, 0.5 * self.z.shape[0] * ref.n_modes)
+        
+    def test_second_cluster_not_rejected(self):
+        """Test that a valid second cluster is accepted (circularity case)."""
+        rng = np.random.default_rng(3)
+        c0 = rng.normal(0, 1.0, (500, 4))
+        c1 = rng.normal(0, 1.0, (500, 4)) + 20.0
+        ref = MixtureReference.fit(np.vstack([c0, c1]), n_modes=2)
+        
+        single = WhitenedReference.fit(c0, mode='scalar')
+        codes_single = rlcs_control_codes(c1, None, reference=single, stream_ids=np.arange(500))
+        codes_mixture = rlcs_control_codes(c1, None, reference=ref, stream_ids=np.arange(500))
+        
+        self.assertTrue(np.all(codes_single == SIGNAL_ABSTAIN))
+        self.assertLess(np.mean(codes_mixture == SIGNAL_ABSTAIN), 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
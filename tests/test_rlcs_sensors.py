@@ -6,7 +6,8 @@ Verifies the mathematical correctness and determinism of the sensor functions.
 
 import unittest
 import numpy as np
-from resed.rlcs.sensors import population_consistency, temporal_consistency, agreement_consistency
+from resed.rlcs.sensors import population_consistency, temporal_consistency, agreement_consistency, fused_consistency
+from resed.rlcs.sensors.temporal import TemporalSensor, StreamStateTable, stream_temporal_consistency
 
 class TestRlcsSensors(unittest.TestCase):
     
@@ -52,5 +53,90 @@ class TestRlcsSensors(unittest.TestCase):
         # z[1] orthogonal to z_prime[1] -> cos sim 0.0
         self.assertAlmostEqual(scores[1], 0.0)
 
+    def test_fused_consistency_matches_reference(self):
+        """Test that the fused kernel matches the per-sensor functions."""
+        rng = np.random.default_rng(0)
+        z = rng.normal(0.5, 1.0, (64, 16))
+        z_prime = z + rng.normal(0, 0.3, z.shape)
+        mu = rng.normal(0.5, 0.1, 16)
+        
+        d, t, a = fused_consistency(z, mu, 2.0, z_prime=z_prime)
+        
+        np.testing.assert_allclose(d, population_consistency(z, mu, 2.0), rtol=1e-9)
+        np.testing.assert_allclose(t, temporal_consistency(z), rtol=1e-9)
+        np.testing.assert_allclose(a, agreement_consistency(z, z_prime), rtol=1e-9)
+        
+    def test_fused_consistency_reuses_norms(self):
+        """Test scalar mu and precomputed norms from the statistics channel."""
+        z = np.array([[3.0, 4.0], [0.0, 0.0], [3.0, 4.0]])
+        z_norms = np.linalg.norm(z, axis=1)
+        
+        d, t, a = fused_consistency(z, 0.0, 1.0, z_norms=z_norms)
+        
+        np.testing.assert_allclose(d, [5.0, 0.0, 5.0], atol=1e-12)
+        np.testing.assert_allclose(t, [1.0, np.exp(-5.0), np.exp(-5.0)], atol=1e-12)
+        self.assertIsNone(a)
+
+    def test_temporal_sensor_chunked_matches_batch(self):
+        """Test that streaming in chunks reproduces single-batch scores."""
+        rng = np.random.default_rng(3)
+        z = rng.normal(0, 0.5, (101, 6))
+        expected = temporal_consistency(z)
+        
+        for chunk_size in (1, 7, 50, 101):
+            sensor = TemporalSensor()
+            scores = np.concatenate([
+                sensor.measure(z[i:i + chunk_size]) for i in range(0, len(z), chunk_size)
+            ])
+            np.testing.assert_array_equal(scores, expected)
+            
+    def test_temporal_sensor_state(self):
+        """Test state carry, empty chunks and reset."""
+        sensor = TemporalSensor()
+        sensor.measure(np.array([[0.0, 0.0]]))
+        
+        self.assertEqual(sensor.measure(np.zeros((0, 2))).shape, (0,))
+        self.assertAlmostEqual(sensor.measure(np.array([[3.0, 4.0]]))[0], np.exp(-5.0))
+        
+        sensor.reset()
+        self.assertEqual(sensor.measure(np.array([[0.0, 0.0]]))[0], 1.0)
+
+    def test_stream_temporal_consistency_per_stream(self):
+        """Test that interleaved streams are scored against their own history."""
+        rng = np.random.default_rng(4)
+        z = rng.normal(0, 0.5, (200, 3))
+        stream_ids = rng.integers(0, 13, 200)
+        
+        scores = stream_temporal_consistency(z, stream_ids)
+        
+        for sid in np.unique(stream_ids):
+            rows = np.nonzero(stream_ids == sid)[0]
+            np.testing.assert_array_equal(scores[rows], temporal_consistency(z[rows]))
+            
+    def test_stream_state_chunked_matches_batch(self):
+        """Test that keyed state carries every stream across chunks."""
+        rng = np.random.default_rng(5)
+        z = rng.normal(0, 0.5, (300, 4))
+        stream_ids = rng.integers(100, 140, 300)
+        expected = stream_temporal_consistency(z, stream_ids)
+        
+        sensor = TemporalSensor(capacity=64)
+        scores = np.concatenate([
+            sensor.measure(z[i:i + 17], stream_ids=stream_ids[i:i + 17]) for i in range(0, 300, 17)
+        ])
+        np.testing.assert_array_equal(scores, expected)
+        
+    def test_stream_state_lru_eviction(self):
+        """Test that the least recently used stream is evicted when full."""
+        table = StreamStateTable(capacity=2)
+        table.store(np.array([1, 2]), np.array([[1.0], [2.0]]), recency=np.array([0, 1]))
+        table.store(np.array([1]), np.array([[1.5]]), recency=np.array([0]))
+        table.store(np.array([3]), np.array([[3.0]]), recency=np.array([0]))
+        
+        found, slots = table.lookup(np.array([1, 2, 3]))
+        np.testing.assert_array_equal(found, [True, False, True])
+        self.assertEqual(table.latents[slots[0], 0], 1.5)
+        self.assertEqual(len(table), 2)
+
 if __name__ == '__main__':
     unittest.main()